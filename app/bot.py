@@ -1,12 +1,14 @@
 import logging
 import ccxt
 import json
+import orjson
 import time
 import pandas as pd
 import os
 import sys
 from collections import deque
 from datetime import datetime
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Binance Connector
@@ -15,7 +17,7 @@ from binance.websocket.spot.websocket_stream import SpotWebsocketStreamClient
 # Add current directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from persistence import DynamoManager
+from persistence import DynamoManager, install_orjson_parser
 from strategies import StrategyRegistry
 from position_manager import PositionManager
 
@@ -64,8 +66,7 @@ class TradingBot:
         self.ws_client = None
 
     def load_config(self, path):
-        with open(path, 'r') as f:
-            self.config = json.load(f)
+        self.config = orjson.loads(Path(path).read_bytes())
         
         self.symbols = self.config['trading']['symbols']
         self.base_currency = self.config['trading']['base_currency']
@@ -93,6 +94,7 @@ class TradingBot:
 
     def setup_persistence(self):
         try:
+            install_orjson_parser()
             self.db = DynamoManager(self.config)
         except Exception as e:
             logger.error(f"Failed to initialize DynamoDB: {e}")
@@ -386,6 +388,7 @@ class TradingBot:
                         count += 1
                         if count % 10 == 0: sum = 0 # Dummy op to not spam logs too distinct
                     
+                    self.db.flush()
                     logger.info(f"Successfully persisted {count} candles for {symbol}.")
                     
                     # Set the latest price for status
@@ -431,20 +434,18 @@ class TradingBot:
                         pos['force_close'] = False
                 
                 # 3. Regular Order Status Check
-                for order_id in list(self.position_manager.pending_orders.keys()):
-                    order_data = self.position_manager.pending_orders.get(order_id)
-                    if order_data:
-                        symbol = order_data['symbol']
-                        current_price = self.latest_prices.get(symbol)
-                        self.position_manager.check_order_status(order_id, current_price)
+                if self.position_manager.simulator:
+                    # TEST: one pass over the simulator's whole pending book
+                    self.position_manager.check_test_fills(self.latest_prices)
+                else:
+                    # LIVE: one open-orders call per symbol, not one fetch per order
+                    self.position_manager.check_live_fills()
                 
                 # 4. Cancel expired orders
                 self.position_manager.cancel_expired_orders()
                 
                 # 5. Update P&L for open positions
-                for symbol in self.symbols:
-                    if symbol in self.latest_prices:
-                        self.position_manager.update_position_pnl(symbol, self.latest_prices[symbol])
+                self.position_manager.update_positions_pnl(self.latest_prices)
                         
             except Exception as e:
                 logger.error(f"Order monitoring error: {e}")
@@ -461,4 +462,8 @@ class TradingBot:
 
 if __name__ == "__main__":
     bot = TradingBot('config.json')
-    bot.run()
+    try:
+        bot.run()
+    finally:
+        # Don't lose buffered or in-flight DynamoDB writes on exit
+        bot.db.shutdown()
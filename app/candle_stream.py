@@ -0,0 +1,70 @@
+import json
+import logging
+import threading
+from collections import deque
+
+# Binance Connector
+from binance.websocket.spot.websocket_stream import SpotWebsocketStreamClient
+
+logger = logging.getLogger(__name__)
+
+class LiveCandleStream:
+    """
+    Keeps the most recent klines for one symbol in memory.
+    - Subscribes to the Binance kline WebSocket (same feed the bot uses)
+    - In-progress candle is updated in place, closed candles are appended
+    - Lets the dashboard read live candles without polling DynamoDB
+    """
+
+    def __init__(self, symbol: str, interval: str = '1m', maxlen: int = 500,
+                 stream_url: str = "wss://stream.binance.com:9443"):
+        self.symbol = symbol
+        self.interval = interval
+        self.candles = deque(maxlen=maxlen)
+        self.lock = threading.Lock()
+
+        self.ws_client = SpotWebsocketStreamClient(
+            stream_url=stream_url,
+            on_message=self._handle_message,
+            is_combined=True
+        )
+        stream = f"{symbol.replace('/', '').lower()}@kline_{interval}"
+        self.ws_client.subscribe(stream=[stream])
+        logger.info("Live candle stream subscribed to: %s", stream)
+
+    def _handle_message(self, _, message):
+        try:
+            payload = json.loads(message)
+
+            # Handle Combined Stream Format (is_combined=True)
+            data = payload['data'] if 'data' in payload else payload
+            if data.get('e') != 'kline':
+                return
+
+            k = data['k']
+            candle = {
+                'timestamp': k['t'],
+                'open': float(k['o']),
+                'high': float(k['h']),
+                'low': float(k['l']),
+                'close': float(k['c']),
+                'volume': float(k['v']),
+                'symbol': self.symbol
+            }
+
+            with self.lock:
+                if self.candles and self.candles[-1]['timestamp'] == candle['timestamp']:
+                    self.candles[-1] = candle
+                else:
+                    self.candles.append(candle)
+        except Exception as e:
+            logger.error("Live candle stream error: %s", e)
+
+    def is_alive(self) -> bool:
+        """False once the socket has closed; the connector does not reconnect on its own."""
+        return self.ws_client.socket_manager.is_alive()
+
+    def get_candles(self) -> list:
+        """Snapshot of buffered candles, oldest first."""
+        with self.lock:
+            return list(self.candles)
@@ -1,7 +1,6 @@
 import streamlit as st
 import pandas as pd
 import json
-import boto3
 import time
 from datetime import datetime
 import os
@@ -9,7 +8,7 @@ import sys
 
 # Add app directory to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from persistence import DynamoManager
+from page_utils import CONFIG_PATH, load_config, get_db
 
 # Page Config
 st.set_page_config(
@@ -18,13 +17,7 @@ st.set_page_config(
     layout="wide"
 )
 
-# Load Config
-CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
-
-def load_config():
-    with open(CONFIG_PATH, 'r') as f:
-        return json.load(f)
-
+# Config (loaded via the shared cached helper, saved back as indented JSON)
 def save_config(config):
     with open(CONFIG_PATH, 'w') as f:
         json.dump(config, f, indent=4)
@@ -32,10 +25,9 @@ def save_config(config):
 config = load_config()
 
 # Helper: DynamoDB Connection
-# Re-using persistence logic slightly modified for st caching usually, but here direct import
-# Note: Streamlit re-runs script on interaction
+# Note: Streamlit re-runs script on interaction, get_db keeps one DynamoManager across reruns
 try:
-    db = DynamoManager(config)
+    db = get_db(config)
     db_connected = True
 except Exception as e:
     st.error(f"Failed to connect to DynamoDB: {e}")
@@ -81,7 +73,7 @@ col1, col2 = st.columns(2)
 with col1:
     st.subheader("Recent Trades")
     if db_connected:
-        trades = db.get_trades(limit=20)
+        trades = db.get_trades(limit=20, fields=('timestamp', 'symbol', 'action', 'price', 'amount', 'algo'))
         if trades:
             df_trades = pd.DataFrame(trades)
             # Convert decimal to float for display
@@ -116,15 +108,14 @@ with col2:
         if st.button("Load Graph"):
             with st.spinner("Fetching data..."):
                 try:
-                    prices = db.get_price_history(selected_symbol, limit=limit)
+                    prices = db.get_price_columns(selected_symbol, limit=limit)
                     
-                    if prices:
-                        df = pd.DataFrame(prices)
-                        df['price'] = df['price'].astype(float)
-                        # Fix: Ensure timestamp is numeric (handle Decimal/String from DB)
-                        df['timestamp'] = pd.to_numeric(df['timestamp'])
-                        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                        df = df.set_index('timestamp')
+                    if len(prices['timestamp']):
+                        # Columns arrive as typed numpy arrays, no per-cell Decimal conversion here
+                        df = pd.DataFrame(
+                            {'price': prices['price']},
+                            index=pd.to_datetime(prices['timestamp'], unit='ms').rename('timestamp')
+                        )
                         
                         # Calculate Indicators on the fly
                         import ta
@@ -0,0 +1,13 @@
+import os
+import random
+import time
+
+# Seeded once from the OS; IDs only need to be unique, not unpredictable
+_rng = random.Random(os.urandom(16))
+
+def new_id() -> str:
+    """
+    32-char hex ID: nanosecond timestamp + 64 random bits.
+    Cheaper than str(uuid.uuid4()) and sorts by creation time.
+    """
+    return f"{time.time_ns():016x}{_rng.getrandbits(64):016x}"
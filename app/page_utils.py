@@ -1,9 +1,54 @@
 
 import streamlit as st
 import time
+import os
+import ccxt
+import orjson
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from decimal import Decimal
+from pathlib import Path
+from persistence import DynamoManager, install_orjson_parser
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+
+@st.cache_data
+def _load_config(path, mtime):
+    # mtime is only part of the cache key so edits to config.json invalidate it
+    return orjson.loads(Path(path).read_bytes())
+
+def load_config():
+    """Parsed config.json, re-read only when the file changes."""
+    return _load_config(CONFIG_PATH, os.path.getmtime(CONFIG_PATH))
+
+@st.cache_resource
+def get_db(config):
+    """One DynamoManager (boto3 resource + tables) per config, shared across reruns and pages."""
+    install_orjson_parser()
+    # Pages only read/display numbers, so have DynamoManager hand back floats instead of Decimal
+    return DynamoManager(config, float_numbers=True)
+
+@st.cache_resource
+def get_exchange(exchange_config):
+    """One ccxt client with markets loaded per exchange config, shared across reruns and pages."""
+    exchange_class = getattr(ccxt, exchange_config['id'])
+    exchange = exchange_class({
+        'apiKey': os.getenv('BINANCE_API_KEY'),
+        'secret': os.getenv('BINANCE_SECRET'),
+        'enableRateLimit': True,
+        'options': exchange_config['options']
+    })
+    
+    if exchange_config.get('testnet'):
+        exchange.set_sandbox_mode(True)
+    
+    exchange.load_markets()
+    return exchange
+
+def pnl_colors(s):
+    """Styler.apply callback: green/red/gray text for a whole P&L column in one pass."""
+    return np.where(s > 0, 'color: green', np.where(s < 0, 'color: red', 'color: gray'))
 
 def render_account_summary(db, mode, config):
     """Render Balance, Equity, P&L Summary."""
@@ -40,12 +85,16 @@ def render_account_summary(db, mode, config):
 
 def render_positions_table(db, mode):
     """Render Positions with Inline Edit/Close."""
-    table = db.test_positions_table if mode == "TEST" else db.positions_table
+    table = db.positions_tables[mode]
     st.subheader("Position History")
     
     try:
-        response = table.scan()
-        positions = response.get('Items', [])
+        positions = db.parallel_scan(
+            table,
+            ProjectionExpression='position_id, symbol, side, entry_price, exit_price, current_price, quantity, '
+                                 'pnl, #st, entry_time, exit_time, stop_loss, take_profit',
+            ExpressionAttributeNames={'#st': 'status'}
+        )
         
         if positions:
             # Data Processing
@@ -55,12 +104,6 @@ def render_positions_table(db, mode):
             if 'exit_time' in df.columns: 
                 df['exit_time'] = pd.to_datetime(df['exit_time'].astype(int), unit='ms')
             
-            # Convert decimal/float cols
-            numeric_cols = ['entry_price', 'exit_price', 'quantity', 'pnl', 'current_price', 'stop_loss', 'take_profit']
-            for col in numeric_cols:
-                if col in df.columns: 
-                    df[col] = df[col].astype(float)
-            
             df = df.sort_values('entry_time', ascending=False)
             
             # Include 'request_close' in open positions view
@@ -96,9 +139,12 @@ def render_positions_table(db, mode):
                 # Add status column to view if not there
                 if 'status' not in cols: cols.append('status')
 
+                # Styles only show on the read-only columns, which includes pnl
+                view = open_pos[cols].style.apply(pnl_colors, subset=['pnl']) if 'pnl' in cols else open_pos[cols]
+
                 # Render Editor
                 edited_df = st.data_editor(
-                    open_pos[cols],
+                    view,
                     hide_index=True,
                     column_config=column_config,
                     disabled=['symbol', 'side', 'entry_price', 'current_price', 'quantity', 'pnl', 'entry_time', 'status'],
@@ -163,10 +209,7 @@ def render_positions_table(db, mode):
             if not closed_pos.empty:
                 cols = ['symbol', 'side', 'entry_price', 'exit_price', 'quantity', 'pnl', 'entry_time', 'exit_time']
                 if 'pnl' in closed_pos.columns:
-                     st.dataframe(closed_pos[cols].style.applymap(
-                        lambda v: 'color: green' if (isinstance(v, (int, float)) and v > 0) else 'color: red' if (isinstance(v, (int, float)) and v < 0) else '', 
-                        subset=['pnl']
-                    ), use_container_width=True)
+                     st.dataframe(closed_pos[cols].style.apply(pnl_colors, subset=['pnl']), use_container_width=True)
                 else:
                      st.dataframe(closed_pos[cols], use_container_width=True)
             else:
@@ -182,11 +225,14 @@ def render_orders_table(db, mode):
     """Render Orders table with Inline Cancel functionality."""
     st.subheader("Order History")
     
-    table = db.test_orders_table if mode == "TEST" else db.orders_table
+    table = db.orders_tables[mode]
     
     try:
-        response = table.scan()
-        orders = response.get('Items', [])
+        orders = db.parallel_scan(
+            table,
+            ProjectionExpression='order_id, symbol, side, price, amount, #st, created_at, filled_at',
+            ExpressionAttributeNames={'#st': 'status'}
+        )
         
         if orders:
             df = pd.DataFrame(orders)
@@ -195,9 +241,6 @@ def render_orders_table(db, mode):
             for col in ['created_at', 'filled_at', 'expires_at']:
                 if col in df.columns:
                     df[col] = pd.to_datetime(df[col].astype(int), unit='ms')
-            for col in ['price', 'amount', 'fill_price']:
-                if col in df.columns:
-                    df[col] = df[col].astype(float)
             df = df.sort_values('created_at', ascending=False)
             
             # 1. Filter Display
@@ -267,20 +310,21 @@ def render_orders_table(db, mode):
     except Exception as e:
         st.error(f"Error loading orders: {e}")
 
-def render_signals_table(signals_table):
+def render_signals_table(db):
     """Render Signals table."""
     st.subheader("Generated Signals")
     try:
-        response = signals_table.scan()
-        items = response.get('Items', [])
+        items = db.parallel_scan(
+            db.signals_table,
+            ProjectionExpression='#ts, symbol, #sig, algo, price',
+            ExpressionAttributeNames={'#ts': 'timestamp', '#sig': 'signal'}
+        )
         
         if items:
             df = pd.DataFrame(items)
             
             if 'timestamp' in df.columns:
                 df['timestamp'] = pd.to_datetime(df['timestamp'].astype(int), unit='ms')
-            if 'price' in df.columns:
-                df['price'] = df['price'].astype(float)
                 
             df = df.sort_values('timestamp', ascending=False)
             
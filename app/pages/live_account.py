@@ -1,22 +1,20 @@
 
 import streamlit as st
-import json
 import os
 import sys
 
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from persistence import DynamoManager
-from page_utils import render_account_summary, render_positions_table, render_orders_table, render_signals_table
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+from page_utils import load_config, get_db, render_account_summary, render_positions_table, render_orders_table, render_signals_table
 
 st.set_page_config(page_title="Live Account", page_icon="💰", layout="wide")
 st.title("💰 Live Account")
 
-CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'config.json')
-with open(CONFIG_PATH, 'r') as f:
-    config = json.load(f)
+config = load_config()
 
 try:
-    db = DynamoManager(config)
+    db = get_db(config)
 except Exception as e:
     st.error(f"DB Connection Failed: {e}")
     st.stop()
@@ -37,7 +35,7 @@ with tab2:
     render_orders_table(db, "LIVE")
 
 with tab3:
-    render_signals_table(db.signals_table)
+    render_signals_table(db)
 
 if st.button("🔄 Refresh"):
     st.rerun()
@@ -1,16 +1,23 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.graph_objects as go
 import time
 import os
 import sys
-import json
+import traceback
+import functools
 from decimal import Decimal
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from boto3.dynamodb.conditions import Key
 
 # Add app directory to path to import persistence
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from persistence import DynamoManager
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+from position_manager import PositionManager
+from page_utils import load_config, get_db, get_exchange
+from candle_stream import LiveCandleStream
 
 st.set_page_config(
     page_title="Live Candle Chart",
@@ -22,60 +29,29 @@ st.set_page_config(
 st.title("🕯️ Live Bot Candles (1m)")
 
 # === Bot Status Indicator ===
+def status_from_age(diff):
+    """Map seconds since the bot's last activity to (icon, message, color)."""
+    if diff < 120: # 2 mins
+        return "🟢", f"Online (Last beat: {int(diff)}s ago)", "green"
+    elif diff < 300: # 5 mins
+        return "🟠", f"Lagging (Last beat: {int(diff)}s ago)", "orange"
+    else:
+        return "🔴", f"Offline (Last beat: {int(diff)}s ago)", "red"
+
+@st.cache_data(ttl=2)
 def get_bot_status():
+    """Bot liveness from the age of api_logs.txt (the bot logs at least once a minute)."""
     try:
         log_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'api_logs.txt')
-        if not os.path.exists(log_path):
+        try:
+            log_stat = os.stat(log_path)
+        except FileNotFoundError:
             return "🔴", "Offline (No logs)", "red"
         
-        # Read last line efficiently
-        with open(log_path, 'rb') as f:
-            try:
-                f.seek(-1024, os.SEEK_END)
-            except OSError:
-                pass # File smaller than 1024 bytes
-            last_lines = f.readlines()
-            
-        if not last_lines:
-             return "🔴", "Offline (Empty logs)", "red"
-             
-        # Find last line with timestamp
-        # Iterate backwards to find a valid line
-        last_valid_line = None
-        for line in reversed(last_lines):
-            decoded = line.decode('utf-8', errors='ignore').strip()
-            if "[WS UPDATE]" in decoded:
-                last_valid_line = decoded
-                break
+        if log_stat.st_size == 0:
+            return "🔴", "Offline (Empty logs)", "red"
         
-        if not last_valid_line:
-            # Fallback to just last line if we can't find tag
-             last_valid_line = last_lines[-1].decode('utf-8', errors='ignore').strip()
-
-        # Format: 2026-01-03 01:10:05 [WS UPDATE] ...
-        # Or standard log: 2026-01-03 ... [INFO] ...
-        # Both start with timestamp YYYY-MM-DD HH:MM:SS
-        parts = last_valid_line.split(' [')
-        if len(parts) > 0:
-            ts_str = parts[0].strip()
-            # Try parsing
-            try:
-                # Handle potential millisecond formatting if present, though bot.py uses %Y-%m-%d %H:%M:%S
-                ts_str = ts_str.split(',')[0] # Remove milliseconds if typical logging
-                last_active = datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
-                
-                diff = (datetime.now() - last_active).total_seconds()
-                
-                if diff < 120: # 2 mins
-                    return "🟢", f"Online (Last beat: {int(diff)}s ago)", "green"
-                elif diff < 300: # 5 mins
-                    return "🟠", f"Lagging (Last beat: {int(diff)}s ago)", "orange"
-                else:
-                    return "🔴", f"Offline (Last beat: {int(diff)}s ago)", "red"
-            except Exception as e:
-                # Fallback if parse fails
-                return "⚪", f"Unknown (Parse Error: {e})", "gray"
-        return "⚪", "Unknown", "gray"
+        return status_from_age(time.time() - log_stat.st_mtime)
             
     except Exception as e:
         return "🔴", f"Error check: {e}", "red"
@@ -85,9 +61,7 @@ st.markdown(f"**Status:** {icon} <span style='color:{color}'>{msg}</span>", unsa
 
 
 # Load Config
-CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'config.json')
-with open(CONFIG_PATH, 'r') as f:
-    config = json.load(f)
+config = load_config()
 
 # Sidebar
 symbols = config['trading']['symbols']
@@ -95,14 +69,72 @@ symbol = st.sidebar.selectbox("Symbol", symbols)
 limit = st.sidebar.slider("Candles to Load", 50, 500, 100)
 refresh_rate = st.sidebar.slider("Refresh Rate (sec)", 5, 60, 5)
 
+auto_refresh = st.sidebar.checkbox("Auto-Refresh", value=True)
+
 # DB Connection
 try:
-    db = DynamoManager(config)
+    db = get_db(config)
 except Exception as e:
     st.error(f"Failed to connect to DB: {e}")
     st.stop()
 
+# Max age of the chart's last candle before a manual trade re-reads the price from DB
+LATEST_PRICE_MAX_AGE_SEC = 120
+
+def get_latest_price(symbol, db):
+    """Latest close for symbol, reusing the candle loaded on the previous run when fresh."""
+    cached_close = st.session_state.get('latest_close', {}).get(symbol)
+    cached_ts = st.session_state.get('latest_ts', {}).get(symbol)
+    if cached_close is not None and cached_ts is not None:
+        if time.time() * 1000 - cached_ts <= LATEST_PRICE_MAX_AGE_SEC * 1000:
+            return cached_close
+    
+    latest_items = db.get_price_history(symbol, limit=1, fields=('timestamp', 'close'))
+    if latest_items:
+        return float(latest_items[0]['close'])
+    return None
+
 # === Manual Trading Controls ===
+def place_manual_order(side, symbol, db, config, mode):
+    """Place a manual limit order ('buy' or 'sell') at the latest price and log it as a MANUAL signal."""
+    signal = side.upper()
+    try:
+        # Get latest price
+        current_price = get_latest_price(symbol, db)
+        if current_price:
+            
+            # Shared exchange client, PositionManager per order
+            exchange = get_exchange(config['exchange'])
+            pm = PositionManager(exchange, db, config['trading']['risk_management'], mode)
+            
+            # Calculate size and place order
+            if pm.can_open_position(symbol):
+                amount = pm.calculate_position_size(symbol, current_price)
+                if amount:
+                    order = pm.place_limit_order(symbol, side, current_price, amount)
+                    if order:
+                        # Log manual signal
+                        db.log_signal({
+                            'symbol': symbol,
+                            'signal': signal,
+                            'algo': 'MANUAL',
+                            'price': current_price,
+                            'timestamp': int(time.time() * 1000)
+                        })
+                        st.sidebar.success(f"✅ {signal} order placed @ ${current_price:.2f}")
+                        st.sidebar.caption(f"Order ID: {order.get('order_id', 'N/A')}")
+                    else:
+                        st.sidebar.error("❌ Order placement returned None")
+                else:
+                    st.sidebar.error("❌ Failed to calculate position size")
+            else:
+                st.sidebar.warning("⚠️ Cannot open position (already have one open)")
+        else:
+            st.sidebar.error("❌ No price data available")
+    except Exception as e:
+        st.sidebar.error(f"❌ Error: {str(e)}")
+        st.sidebar.code(traceback.format_exc())
+
 manual_trading_enabled = config['trading'].get('manual_trading_enabled', False)
 mode = config['trading'].get('mode', 'TEST')
 
@@ -111,403 +143,363 @@ if manual_trading_enabled:
     st.sidebar.subheader("🎮 Manual Trading")
     st.sidebar.caption(f"Mode: **{mode}**")
     
-    col1, col2 = st.sidebar.columns(2)
-    
-    with col1:
-        if st.button("🟢 BUY", use_container_width=True, type="primary"):
-            try:
-                # Import PositionManager
-                sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-                from position_manager import PositionManager
-                import ccxt
-                
-                # Get latest price
-                latest_items = db.get_price_history(symbol, limit=1)
-                if latest_items:
-                    current_price = float(latest_items[0]['close'])
-                    
-                    # Initialize exchange and PositionManager
-                    exchange_class = getattr(ccxt, config['exchange']['id'])
-                    exchange = exchange_class({
-                        'apiKey': os.getenv('BINANCE_API_KEY'),
-                        'secret': os.getenv('BINANCE_SECRET'),
-                        'enableRateLimit': True,
-                        'options': config['exchange']['options']
-                    })
-                    
-                    if config['exchange'].get('testnet'):
-                        exchange.set_sandbox_mode(True)
-                    
-                    pm = PositionManager(exchange, db, config['trading']['risk_management'], mode)
-                    
-                    # Calculate size and place order
-                    if pm.can_open_position(symbol):
-                        amount = pm.calculate_position_size(symbol, current_price)
-                        if amount:
-                            order = pm.place_limit_order(symbol, 'buy', current_price, amount)
-                            if order:
-                                # Log manual signal
-                                db.log_signal({
-                                    'symbol': symbol,
-                                    'signal': 'BUY',
-                                    'algo': 'MANUAL',
-                                    'price': current_price,
-                                    'timestamp': int(time.time() * 1000)
-                                })
-                                st.sidebar.success(f"✅ BUY order placed @ ${current_price:.2f}")
-                                st.sidebar.caption(f"Order ID: {order.get('order_id', 'N/A')}")
-                            else:
-                                st.sidebar.error("❌ Order placement returned None")
-                        else:
-                            st.sidebar.error("❌ Failed to calculate position size")
-                    else:
-                        st.sidebar.warning("⚠️ Cannot open position (already have one open)")
-                else:
-                    st.sidebar.error("❌ No price data available")
-            except Exception as e:
-                st.sidebar.error(f"❌ Error: {str(e)}")
-                import traceback
-                st.sidebar.code(traceback.format_exc())
+    # side -> (button label, button type)
+    manual_buttons = {
+        'buy': ("🟢 BUY", "primary"),
+        'sell': ("🔴 SELL", "secondary")
+    }
     
-    with col2:
-        if st.button("🔴 SELL", use_container_width=True, type="secondary"):
-            try:
-                sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-                from position_manager import PositionManager
-                import ccxt
-                
-                latest_items = db.get_price_history(symbol, limit=1)
-                if latest_items:
-                    current_price = float(latest_items[0]['close'])
-                    
-                    exchange_class = getattr(ccxt, config['exchange']['id'])
-                    exchange = exchange_class({
-                        'apiKey': os.getenv('BINANCE_API_KEY'),
-                        'secret': os.getenv('BINANCE_SECRET'),
-                        'enableRateLimit': True,
-                        'options': config['exchange']['options']
-                    })
-                    
-                    if config['exchange'].get('testnet'):
-                        exchange.set_sandbox_mode(True)
-                    
-                    pm = PositionManager(exchange, db, config['trading']['risk_management'], mode)
-                    
-                    if pm.can_open_position(symbol):
-                        amount = pm.calculate_position_size(symbol, current_price)
-                        if amount:
-                            order = pm.place_limit_order(symbol, 'sell', current_price, amount)
-                            if order:
-                                db.log_signal({
-                                    'symbol': symbol,
-                                    'signal': 'SELL',
-                                    'algo': 'MANUAL',
-                                    'price': current_price,
-                                    'timestamp': int(time.time() * 1000)
-                                })
-                                st.sidebar.success(f"✅ SELL order placed @ ${current_price:.2f}")
-                                st.sidebar.caption(f"Order ID: {order.get('order_id', 'N/A')}")
-                            else:
-                                st.sidebar.error("❌ Order placement returned None")
-                        else:
-                            st.sidebar.error("❌ Failed to calculate position size")
-                    else:
-                        st.sidebar.warning("⚠️ Cannot open position (already have one open)")
-                else:
-                    st.sidebar.error("❌ No price data available")
-            except Exception as e:
-                st.sidebar.error(f"❌ Error: {str(e)}")
-                import traceback
-                st.sidebar.code(traceback.format_exc())
+    for col, (side, (label, btn_type)) in zip(st.sidebar.columns(2), manual_buttons.items()):
+        with col:
+            if st.button(label, use_container_width=True, type=btn_type):
+                place_manual_order(side, symbol, db, config, mode)
     
     st.sidebar.caption("⚠️ Orders use exchange minimum quantity")
 
 
-# === Active Stats Display ===
-st.markdown("### 📊 Active Status")
-stats_col1, stats_col2, stats_col3, stats_col4 = st.columns(4)
+# Helper to fetch data
+# History (with bot indicators) only needs re-reading about once per candle,
+# the in-progress candle comes from the live stream below
+@st.cache_data(ttl=60) 
+def fetch_bot_data(symbol, limit):
+    # We reuse get_price_history but it now returns candle dicts
+    return db.get_price_history(symbol, limit=limit)
 
-# 1. Active Position
-active_pos = db.get_active_position(mode)
-if active_pos and active_pos['symbol'] == symbol:
-    side = active_pos['side'].upper()
-    entry = float(active_pos['entry_price'])
-    qty = float(active_pos['quantity'])
-    pnl = float(active_pos.get('pnl', 0))
-    
-    # Calculate current PnL if we have price
-    # We fetch candle data later, but we can do a quick check here or wait?
-    # Let's just use what's in DB or wait for the chart data? 
-    # DB might be stale if bot updates slowly.
-    # Let's display what we have.
+def candle_stream_url(exchange_config):
+    """Kline WebSocket endpoint for the configured exchange, chosen as the bot does."""
+    if exchange_config.get('testnet'):
+        return "wss://testnet.binance.vision"
+    return "wss://stream.binance.com:9443"
+
+@st.cache_resource(validate=lambda stream: stream.is_alive())
+def get_candle_stream(symbol, interval, stream_url):
+    # One WebSocket per symbol shared by all sessions, reopened once its socket drops
+    return LiveCandleStream(symbol, interval, stream_url=stream_url)
+
+def merge_live_candles(items, live_candles, limit):
+    """Overlay streamed OHLCV onto DB candles (keeping indicators) and append newer ones."""
+    by_ts = {int(item['timestamp']): item for item in items}
+    for candle in live_candles:
+        ts = int(candle['timestamp'])
+        if ts in by_ts:
+            by_ts[ts].update(candle)
+        else:
+            by_ts[ts] = dict(candle)
+    return [by_ts[ts] for ts in sorted(by_ts)][-limit:]
+
+# Candle attributes that are never drawn as indicator lines
+NON_INDICATOR_COLS = frozenset(('open', 'high', 'low', 'close', 'volume', 'symbol', 'timestamp', 'timestamp_dt', 'expiry'))
+
+@functools.lru_cache(maxsize=32)
+def indicator_columns(cols):
+    """Indicator column names for a tuple of numeric columns; the set of columns rarely changes between ticks."""
+    return tuple(c for c in cols if c not in NON_INDICATOR_COLS)
+
+def columnar_frame(items, cols=None):
+    """
+    Build a DataFrame column by column from DynamoDB items.
+    Skips pandas' list-of-dicts inference; missing attributes become None/NaN.
+    cols defaults to every attribute seen, in first-seen order.
+    """
+    if cols is None:
+        cols = dict.fromkeys(k for item in items for k in item)
+    return pd.DataFrame({c: [item.get(c) for item in items] for c in cols})
+
+@st.cache_data(ttl=60)
+def symbol_has_trade_history(symbol, mode):
+    """Cheap COUNT check so the marker queries are skipped for symbols that never traded."""
+    positions_table = db.positions_tables[mode]
+    try:
+        for table, index_name in ((positions_table, 'symbol-entry_time-index'),
+                                  (db.signals_table, 'symbol-timestamp-index')):
+            resp = table.query(
+                IndexName=index_name,
+                KeyConditionExpression=Key('symbol').eq(symbol),
+                Select='COUNT',
+                Limit=1
+            )
+            if resp.get('Count', 0) > 0:
+                return True
+    except Exception:
+        return True # Can't tell, let the marker block try (and report) itself
+    return False
+
+@st.cache_data(ttl=5)
+def fetch_markers(symbol, min_ts_bucket, mode):
+    """
+    Load signal/position/fill markers newer than min_ts_bucket (minutes since epoch).
+    Returns {name: (x, y, hover)} built from plain Python types so it caches cleanly.
+    """
+    min_ts = min_ts_bucket * 60_000
     
-    color = "normal"
-    if pnl > 0: color = "off" # Streamlit metric delta handles color
+    # Determine which tables to query based on mode
+    positions_table = db.positions_tables[mode]
+    orders_table = db.orders_tables[mode]
     
-    with stats_col1:
-        st.metric("Active Position", f"{side} {qty}", delta=f"{pnl:.2f} USDT", delta_color="normal")
-    with stats_col2:
-        st.metric("Entry Price", f"{entry:.2f}")
-else:
-    with stats_col1:
-        st.metric("Active Position", "None")
-    with stats_col2:
-        st.metric("PnL", "0.00")
-
-# 2. Pending Orders
-# Scan for pending orders for this symbol
-if mode == "TEST":
-    o_table = db.test_orders_table
-else:
-    o_table = db.orders_table
+    # The three reads are independent, so overlap their round trips
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        # Get positions (entry points)
+        # Query the symbol/entry_time GSI instead of scanning the table
+        f_positions = pool.submit(
+            db.paginated,
+            positions_table.query,
+            IndexName='symbol-entry_time-index',
+            KeyConditionExpression=Key('symbol').eq(symbol) & Key('entry_time').gte(Decimal(str(min_ts))),
+            ProjectionExpression='entry_time, entry_price, side'
+        )
 
-try:
-    resp = o_table.scan(
-        FilterExpression='symbol = :sym AND #st = :pending',
-        ExpressionAttributeNames={'#st': 'status'},
-        ExpressionAttributeValues={':sym': symbol, ':pending': 'pending'}
-    )
-    pending_orders = resp.get('Items', [])
-    buy_orders = [o for o in pending_orders if o['side'] == 'buy']
-    sell_orders = [o for o in pending_orders if o['side'] == 'sell']
+        # Get filled orders (trade executions)
+        # filled_at is only written on fill, so this index is sparse and needs no status filter
+        f_orders = pool.submit(
+            db.paginated,
+            orders_table.query,
+            IndexName='symbol-filled_at-index',
+            KeyConditionExpression=Key('symbol').eq(symbol) & Key('filled_at').gte(Decimal(str(min_ts))),
+            ProjectionExpression='filled_at, price, side'
+        )
+
+        # Get signals
+        f_signals = pool.submit(
+            db.paginated,
+            db.signals_table.query,
+            IndexName='symbol-timestamp-index',
+            KeyConditionExpression=Key('symbol').eq(symbol) & Key('timestamp').gte(Decimal(str(min_ts))),
+            ProjectionExpression='#ts, price, #sig, algo',
+            ExpressionAttributeNames={'#ts': 'timestamp', '#sig': 'signal'}
+        )
+
+    positions, filled_orders, signals = f_positions.result(), f_orders.result(), f_signals.result()
+
+    # Vectorized marker assembly: one datetime/float conversion per column instead of per row
+    def to_frame(items, time_col, price_col, cols):
+        frame = columnar_frame(items, cols)
+        if frame.empty or time_col not in frame.columns:
+            return pd.DataFrame()
+        frame = frame[frame[time_col].notna() & (frame[time_col] != 0)].copy()
+        frame['t'] = pd.to_datetime(frame[time_col].astype('int64'), unit='ms')
+        frame['p'] = frame[price_col].fillna(0).astype(float) if price_col in frame.columns else 0.0
+        frame['price_str'] = frame['p'].map('{:.2f}'.format)
+        return frame
+
+    def split(frame, mask):
+        if frame.empty:
+            return [], [], []
+        part = frame[mask]
+        return part['t'].tolist(), part['p'].tolist(), part['hover'].tolist()
+
+    # Signals
+    sig_df = to_frame(signals, 'timestamp', 'price', ('timestamp', 'price', 'signal', 'algo'))
+    if not sig_df.empty:
+        algo = sig_df['algo'].fillna('N/A') if 'algo' in sig_df.columns else 'N/A'
+        sig_df['hover'] = ('<b>' + sig_df['signal'] + ' SIGNAL</b><br>Price: $' + sig_df['price_str']
+                           + '<br>Time: ' + sig_df['t'].astype(str) + '<br>Algo: ' + algo + '<extra></extra>')
+        buy_mask = sig_df['signal'].eq('BUY')
+    else:
+        buy_mask = pd.Series(dtype=bool)
+
+    # Positions
+    pos_df = to_frame(positions, 'entry_time', 'entry_price', ('entry_time', 'entry_price', 'side'))
+    if not pos_df.empty:
+        pos_df['hover'] = ('<b>' + pos_df['side'].str.upper() + ' Position</b><br>Price: $' + pos_df['price_str']
+                           + '<br>Time: ' + pos_df['t'].astype(str) + '<extra></extra>')
+        long_mask = pos_df['side'].eq('long')
+    else:
+        long_mask = pd.Series(dtype=bool)
+
+    # Fills (orders without filled_at are skipped)
+    fill_df = to_frame(filled_orders, 'filled_at', 'price', ('filled_at', 'price', 'side'))
+    if not fill_df.empty:
+        fill_df['hover'] = ('<b>' + fill_df['side'].str.upper() + ' Fill</b><br>Price: $' + fill_df['price_str']
+                            + '<br>Time: ' + fill_df['t'].astype(str) + '<extra></extra>')
+        fill_buy_mask = fill_df['side'].eq('buy')
+    else:
+        fill_buy_mask = pd.Series(dtype=bool)
+
+    return {
+        'signal_buy': split(sig_df, buy_mask),
+        'signal_sell': split(sig_df, ~buy_mask),
+        'pos_long': split(pos_df, long_mask),
+        'pos_short': split(pos_df, ~long_mask),
+        'fill_buy': split(fill_df, fill_buy_mask),
+        'fill_sell': split(fill_df, ~fill_buy_mask)
+    }
+
+# Only the stats and chart rerun on each tick, the sidebar and header stay as rendered
+@st.fragment(run_every=f"{refresh_rate}s" if auto_refresh else None)
+def live_chart_block(symbol, limit, mode, db):
+    # === Active Stats Display ===
+    st.markdown("### 📊 Active Status")
+    stats_col1, stats_col2, stats_col3, stats_col4 = st.columns(4)
+
+    # 1. Active Position
+    active_pos = db.get_active_position(mode)
+    if active_pos and active_pos['symbol'] == symbol:
+        side = active_pos['side'].upper()
+        entry = float(active_pos['entry_price'])
+        qty = float(active_pos['quantity'])
+        pnl = float(active_pos.get('pnl', 0))
+    
+        # Calculate current PnL if we have price
+        # We fetch candle data later, but we can do a quick check here or wait?
+        # Let's just use what's in DB or wait for the chart data? 
+        # DB might be stale if bot updates slowly.
+        # Let's display what we have.
     
-    with stats_col3:
-        st.metric("Pending Buys", f"{len(buy_orders)}")
-    with stats_col4:
-        st.metric("Pending Sells", f"{len(sell_orders)}")
+        color = "normal"
+        if pnl > 0: color = "off" # Streamlit metric delta handles color
+    
+        with stats_col1:
+            st.metric("Active Position", f"{side} {qty}", delta=f"{pnl:.2f} USDT", delta_color="normal")
+        with stats_col2:
+            st.metric("Entry Price", f"{entry:.2f}")
+    else:
+        with stats_col1:
+            st.metric("Active Position", "None")
+        with stats_col2:
+            st.metric("PnL", "0.00")
 
-except Exception as e:
-    st.error(f"Error fetching orders: {e}")
+    # 2. Pending Orders
+    # Query pending orders for this symbol
+    o_table = db.orders_tables[mode]
 
-st.divider()
+    try:
+        pending_orders = db.paginated(
+            o_table.query,
+            IndexName='symbol-status-index',
+            KeyConditionExpression=Key('symbol').eq(symbol) & Key('status').eq('pending'),
+            ProjectionExpression='side'
+        )
+        buy_orders = [o for o in pending_orders if o['side'] == 'buy']
+        sell_orders = [o for o in pending_orders if o['side'] == 'sell']
+    
+        with stats_col3:
+            st.metric("Pending Buys", f"{len(buy_orders)}")
+        with stats_col4:
+            st.metric("Pending Sells", f"{len(sell_orders)}")
 
+    except Exception as e:
+        st.error(f"Error fetching orders: {e}")
 
-# Helper to fetch data
-@st.cache_data(ttl=3) 
-def fetch_bot_data(symbol, limit):
-    # We reuse get_price_history but it now returns candle dicts
-    return db.get_price_history(symbol, limit=limit)
+    st.divider()
 
-with st.spinner(f"Fetching {symbol} candles..."):
-    items = fetch_bot_data(symbol, limit)
+    with st.spinner(f"Fetching {symbol} candles..."):
+        items = fetch_bot_data(symbol, limit)
 
-if items:
-    df = pd.DataFrame(items)
+    try:
+        live_candles = get_candle_stream(symbol, config['trading'].get('interval', '1m'),
+                                         candle_stream_url(config['exchange'])).get_candles()
+        if live_candles:
+            items = merge_live_candles(items, live_candles, limit)
+    except Exception as e:
+        st.caption(f"⚠️ Live stream unavailable, showing stored candles: {e}")
+
+    if items:
+        df = columnar_frame(items)
     
-    # Filter for valid candle rows only (must have open, high, low, close)
-    required_cols = ['open', 'high', 'low', 'close']
-    if not set(required_cols).issubset(df.columns):
-        # Identify rows that might be missing these columns? 
-        # Actually, if the DataFrame columns don't exist, it means NO row has them (or they are NaNs).
-        # We need to drop rows where these are NaN if columns exist, OR stop if columns don't exist.
+        # Filter for valid candle rows only (must have open, high, low, close)
+        required_cols = ['open', 'high', 'low', 'close']
+        if not set(required_cols).issubset(df.columns):
+            # Identify rows that might be missing these columns? 
+            # Actually, if the DataFrame columns don't exist, it means NO row has them (or they are NaNs).
+            # We need to drop rows where these are NaN if columns exist, OR stop if columns don't exist.
         
-        # If columns missing entirely, we can't plot candles.
-        # But we might have mixed data where some items have it.
-        # DynamoDB scans usually return all keys found across items? No, it returns list of dicts.
-        # Pandas constructor will make columns for all keys found.
+            # If columns missing entirely, we can't plot candles.
+            # But we might have mixed data where some items have it.
+            # DynamoDB scans usually return all keys found across items? No, it returns list of dicts.
+            # Pandas constructor will make columns for all keys found.
         
-        # Check if columns exist at least
-        missing = [c for c in required_cols if c not in df.columns]
-        if missing:
-            st.warning(f"Waiting for Candle Data... (Received data missing: {missing})")
-            if st.checkbox("Auto-Refresh", value=True):
-                 time.sleep(refresh_rate)
-                 st.rerun()
-            st.stop()
+            # Check if columns exist at least
+            missing = [c for c in required_cols if c not in df.columns]
+            if missing:
+                st.warning(f"Waiting for Candle Data... (Received data missing: {missing})")
+                return
             
-    # Drop rows with NaN in required columns (clean mixed data)
-    df = df.dropna(subset=required_cols)
+        # Drop rows with NaN in required columns (clean mixed data)
+        df = df.dropna(subset=required_cols)
     
-    if df.empty:
-        st.warning("No valid candle data found yet. (Old price data ignored)")
-        if st.checkbox("Auto-Refresh", value=True):
-             time.sleep(refresh_rate)
-             st.rerun()
-        st.stop()
-
-    # Process Types
-    # DynamoDB Decimals -> Float
-    numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = df[col].astype(float)
-            
-    df['timestamp'] = pd.to_numeric(df['timestamp'])
-    df['timestamp_dt'] = pd.to_datetime(df['timestamp'], unit='ms')
+        if df.empty:
+            st.warning("No valid candle data found yet. (Old price data ignored)")
+            return
+
+        # Numbers already arrive as float (get_db uses float_numbers=True)
+        df['timestamp'] = pd.to_numeric(df['timestamp'])
+        df['timestamp_dt'] = pd.to_datetime(df['timestamp'], unit='ms')
+    
+        # Remember the latest candle so manual trades can skip the DB price read
+        st.session_state.setdefault('latest_close', {})[symbol] = float(df['close'].iloc[-1])
+        st.session_state.setdefault('latest_ts', {})[symbol] = int(df['timestamp'].iloc[-1])
     
-    # Identify Indicator Columns (e.g. sma_10, sma_100)
-    ignore = numeric_cols + ['symbol', 'timestamp', 'timestamp_dt', 'expiry']
-    indicators = [c for c in df.columns if c not in ignore]
-    for col in indicators:
-         df[col] = df[col].astype(float)
-
-    # Plot
-    fig = go.Figure()
-
-    # Candlestick Trace
-    fig.add_trace(go.Candlestick(
-        x=df['timestamp_dt'],
-        open=df['open'],
-        high=df['high'],
-        low=df['low'],
-        close=df['close'],
-        name='OHLC'
-    ))
-
-    # Indicators
-    colors = ['orange', 'blue', 'purple', 'black']
-    for i, col in enumerate(indicators):
-        color = colors[i % len(colors)]
-        fig.add_trace(go.Scatter(
+        # Identify Indicator Columns (e.g. sma_10, sma_100)
+        # Only numeric columns can be plotted as lines, so text fields never get cast
+        indicators = list(indicator_columns(tuple(df.select_dtypes(include='number').columns)))
+        if indicators:
+            # Indicators are plot-only lines, float32 is plenty
+            df[indicators] = df[indicators].astype(np.float32, copy=False)
+
+        # Plot
+        fig = go.Figure()
+
+        # Candlestick Trace
+        fig.add_trace(go.Candlestick(
             x=df['timestamp_dt'],
-            y=df[col],
-            line=dict(color=color, width=1),
-            name=col.upper()
+            open=df['open'],
+            high=df['high'],
+            low=df['low'],
+            close=df['close'],
+            name='OHLC'
         ))
+
+        # Indicators
+        colors = ['orange', 'blue', 'purple', 'black']
+        for i, col in enumerate(indicators):
+            color = colors[i % len(colors)]
+            fig.add_trace(go.Scatter(
+                x=df['timestamp_dt'],
+                y=df[col],
+                line=dict(color=color, width=1),
+                name=col.upper()
+            ))
     
-    # === Trade Event Markers ===
-    mode = config['trading'].get('mode', 'TEST')
-    
-    
-    # Determine which tables to query based on mode
-    if mode == "TEST":
-        positions_table = db.test_positions_table
-        orders_table = db.test_orders_table
-    else:
-        positions_table = db.positions_table
-        orders_table = db.orders_table
-    
-    try:
-        # Calculate cutoff time from oldest candle
-        min_ts = df['timestamp'].min()
-        
-        # Get positions (entry points)
-        # Use FilterExpression to only get relevant ones if possible, or filter in Python
-        position_response = positions_table.scan(
-            FilterExpression='symbol = :sym AND entry_time >= :min_ts',
-            ExpressionAttributeValues={
-                ':sym': symbol,
-                ':min_ts': Decimal(str(min_ts))
-            }
-        )
-        positions = position_response.get('Items', [])
-        
-        # Get filled orders (trade executions)
-        order_response = orders_table.scan(
-            FilterExpression='symbol = :sym AND #st = :filled AND filled_at >= :min_ts',
-            ExpressionAttributeNames={'#st': 'status'},
-            ExpressionAttributeValues={
-                ':sym': symbol, 
-                ':filled': 'filled',
-                ':min_ts': Decimal(str(min_ts))
-            }
-        )
-        filled_orders = order_response.get('Items', [])
-        
-        # Get signals
-        signal_response = db.signals_table.scan(
-            FilterExpression='symbol = :sym AND #ts >= :min_ts',
-            ExpressionAttributeNames={'#ts': 'timestamp'},
-            ExpressionAttributeValues={
-                ':sym': symbol,
-                ':min_ts': Decimal(str(min_ts))
-            }
-        )
-        signals = signal_response.get('Items', [])
-        
-        # Prepare data containers
-        signal_buy_x, signal_buy_y, signal_buy_hover = [], [], []
-        signal_sell_x, signal_sell_y, signal_sell_hover = [], [], []
-        
-        pos_long_x, pos_long_y, pos_long_hover = [], [], []
-        pos_short_x, pos_short_y, pos_short_hover = [], [], []
-        
-        fill_buy_x, fill_buy_y, fill_buy_hover = [], [], []
-        fill_sell_x, fill_sell_y, fill_sell_hover = [], [], []
-
-        # Process Signals
-        for signal in signals:
-            t = pd.to_datetime(int(signal['timestamp']), unit='ms')
-            p = float(signal['price'])
-            h = f'<b>{signal["signal"]} SIGNAL</b><br>Price: ${p:.2f}<br>Time: {t}<br>Algo: {signal.get("algo", "N/A")}<extra></extra>'
-            
-            if signal['signal'] == 'BUY':
-                signal_buy_x.append(t)
-                signal_buy_y.append(p)
-                signal_buy_hover.append(h)
-            else:
-                signal_sell_x.append(t)
-                signal_sell_y.append(p)
-                signal_sell_hover.append(h)
-
-        # Process Positions
-        for pos in positions:
-            t = pd.to_datetime(int(pos['entry_time']), unit='ms')
-            p = float(pos['entry_price'])
-            side = pos['side'].upper()
-            h = f'<b>{side} Position</b><br>Price: ${p:.2f}<br>Time: {t}<extra></extra>'
-            
-            if pos['side'] == 'long':
-                pos_long_x.append(t)
-                pos_long_y.append(p)
-                pos_long_hover.append(h)
-            else:
-                pos_short_x.append(t)
-                pos_short_y.append(p)
-                pos_short_hover.append(h)
-
-        # Process Fills
-        for order in filled_orders:
-            if 'filled_at' in order and order['filled_at']:
-                t = pd.to_datetime(int(order['filled_at']), unit='ms')
-                p = float(order.get('price', 0))
-                side = order['side'].upper()
-                h = f'<b>{side} Fill</b><br>Price: ${p:.2f}<br>Time: {t}<extra></extra>'
-                
-                if order['side'] == 'buy':
-                    fill_buy_x.append(t)
-                    fill_buy_y.append(p)
-                    fill_buy_hover.append(h)
-                else:
-                    fill_sell_x.append(t)
-                    fill_sell_y.append(p)
-                    fill_sell_hover.append(h)
-
-        # Helper to add trace
-        def add_marker_trace(x, y, hover, name, color, symbol, size=12):
-            if x:
-                fig.add_trace(go.Scatter(
-                    x=x, y=y, mode='markers',
-                    marker=dict(size=size, color=color, symbol=symbol, line=dict(width=1, color='black')),
-                    name=name, showlegend=True, hovertemplate=hover, hoverinfo='text'
-                ))
-
-        # Add Traces
-        add_marker_trace(signal_buy_x, signal_buy_y, signal_buy_hover, 'Signal BUY', 'blue', 'star', 12)
-        add_marker_trace(signal_sell_x, signal_sell_y, signal_sell_hover, 'Signal SELL', 'orange', 'x', 12)
+        # === Trade Event Markers ===
+        if symbol_has_trade_history(symbol, mode):
+            try:
+                # Bucket the cutoff (oldest candle) to the minute so the cache key is stable across ticks
+                min_ts_bucket = int(df['timestamp'].min()) // 60_000
+                markers = fetch_markers(symbol, min_ts_bucket, mode)
+
+                # Helper to add trace
+                def add_marker_trace(x, y, hover, name, color, symbol, size=12):
+                    if x:
+                        fig.add_trace(go.Scatter(
+                            x=x, y=y, mode='markers',
+                            marker=dict(size=size, color=color, symbol=symbol, line=dict(width=1, color='black')),
+                            name=name, showlegend=True, hovertemplate=hover, hoverinfo='text'
+                        ))
+
+                # Add Traces
+                add_marker_trace(*markers['signal_buy'], 'Signal BUY', 'blue', 'star', 12)
+                add_marker_trace(*markers['signal_sell'], 'Signal SELL', 'orange', 'x', 12)
         
-        add_marker_trace(pos_long_x, pos_long_y, pos_long_hover, 'Position LONG', 'green', 'triangle-up', 15)
-        add_marker_trace(pos_short_x, pos_short_y, pos_short_hover, 'Position SHORT', 'red', 'triangle-down', 15)
+                add_marker_trace(*markers['pos_long'], 'Position LONG', 'green', 'triangle-up', 15)
+                add_marker_trace(*markers['pos_short'], 'Position SHORT', 'red', 'triangle-down', 15)
         
-        add_marker_trace(fill_buy_x, fill_buy_y, fill_buy_hover, 'Fill BUY', 'lightgreen', 'diamond', 10)
-        add_marker_trace(fill_sell_x, fill_sell_y, fill_sell_hover, 'Fill SELL', 'lightcoral', 'diamond', 10)
+                add_marker_trace(*markers['fill_buy'], 'Fill BUY', 'lightgreen', 'diamond', 10)
+                add_marker_trace(*markers['fill_sell'], 'Fill SELL', 'lightcoral', 'diamond', 10)
                 
-    except Exception as e:
-        st.caption(f"⚠️ Could not load trade markers: {e}")
+            except Exception as e:
+                st.caption(f"⚠️ Could not load trade markers: {e}")
+
+        fig.update_layout(
+            title=f"{symbol} Real-Time Bot Stream [{mode} Mode]",
+            yaxis_title="Price (USDT)",
+            xaxis_rangeslider_visible=False,
+            height=700,
+            template="plotly_white" # Easier to read candles 
+        )
 
-    fig.update_layout(
-        title=f"{symbol} Real-Time Bot Stream [{mode} Mode]",
-        yaxis_title="Price (USDT)",
-        xaxis_rangeslider_visible=False,
-        height=700,
-        template="plotly_white" # Easier to read candles 
-    )
+        st.plotly_chart(fig, use_container_width=True)
 
-    st.plotly_chart(fig, use_container_width=True)
-    
-    if st.checkbox("Auto-Refresh", value=True):
-        time.sleep(refresh_rate)
-        st.rerun()
+    else:
+        st.warning("No candle data found yet. Wait for the next 1m close...")
 
-else:
-    st.warning("No candle data found yet. Wait for the next 1m close...")
+live_chart_block(symbol, limit, mode, db)
@@ -1,25 +1,23 @@
 
 import streamlit as st
-import json
 import os
 import sys
 
 # Add app directory to path
-sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from persistence import DynamoManager
-from page_utils import render_account_summary, render_positions_table, render_orders_table, render_signals_table
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+from page_utils import load_config, get_db, render_account_summary, render_positions_table, render_orders_table, render_signals_table
 
 st.set_page_config(page_title="Test Account", page_icon="🧪", layout="wide")
 st.title("🧪 Test Account (Paper Trading)")
 
 # Load config
-CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'config.json')
-with open(CONFIG_PATH, 'r') as f:
-    config = json.load(f)
+config = load_config()
 
 # Connect DB
 try:
-    db = DynamoManager(config)
+    db = get_db(config)
 except Exception as e:
     st.error(f"DB Connection Failed: {e}")
     st.stop()
@@ -38,7 +36,7 @@ with tab2:
 with tab3:
     # Note: Signals are currently shared/mixed. 
     # Ideally should filter if we added mode to signals, but for now showing all is safer than none.
-    render_signals_table(db.signals_table)
+    render_signals_table(db)
 
 if st.button("🔄 Refresh"):
     st.rerun()
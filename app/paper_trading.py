@@ -1,10 +1,34 @@
 import logging
-import uuid
-from datetime import datetime
-from typing import Optional, Dict
+import time
+import numpy as np
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict, List
+from ids import new_id
 
 logger = logging.getLogger(__name__)
 
+def now_ms() -> int:
+    """Current epoch time in integer milliseconds (the format stored in DynamoDB)."""
+    return time.time_ns() // 1_000_000
+
+@dataclass(slots=True)
+class Position:
+    """A simulated position: fixed fields instead of a dict per position."""
+    position_id: str
+    symbol: str
+    side: str
+    entry_price: float
+    quantity: float
+    entry_time: int
+    status: str
+    exit_price: Optional[float] = None
+    exit_time: Optional[int] = None
+    pnl: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
 class PaperTradingSimulator:
     """
     Simulates exchange behavior for TEST mode.
@@ -14,12 +38,22 @@ class PaperTradingSimulator:
     - Uses real price data for accurate simulation
     """
     
-    def __init__(self, initial_balance: float):
+    def __init__(self, initial_balance: float, history_cap: int = 10_000):
         self.initial_balance = initial_balance
         self.balance = initial_balance
-        self.positions = {}  # symbol -> position dict
+        self.positions: Dict[str, Position] = {}  # symbol -> Position
         self.pending_orders = {}  # order_id -> order dict
-        self.filled_orders = []
+        self.filled_orders = deque(maxlen=history_cap)  # most recent fills only
+        self.filled_orders_by_id = {}  # order_id -> order, same entries as filled_orders
+        
+        # Numeric mirror of open positions for get_equity (one slot per symbol)
+        # side is +1 long / -1 short; freed slots keep qty 0 so they add no P&L
+        self._entry = np.zeros(8, dtype=np.float64)
+        self._qty = np.zeros(8, dtype=np.float64)
+        self._side = np.ones(8, dtype=np.int8)
+        self._sym_to_idx = {}
+        self._free = []
+        self._n = 0  # slots in use, including freed ones
         
         logger.info(f"Paper Trading Simulator initialized with ${initial_balance:,.2f}")
     
@@ -34,18 +68,42 @@ class PaperTradingSimulator:
         Args:
             current_prices: Dict of symbol -> current_price
         """
-        unrealized_pnl = 0.0
+        # Flat between trades and during warmup: nothing to mark to market
+        if not self.positions:
+            return self.balance
+        n = self._n
         
-        for symbol, position in self.positions.items():
+        # Symbols without a price are marked at entry, i.e. contribute no P&L
+        prices = self._entry[:n].copy()
+        for symbol, idx in self._sym_to_idx.items():
             if symbol in current_prices:
-                current_price = current_prices[symbol]
-                if position['side'] == 'long':
-                    pnl = (current_price - position['entry_price']) * position['quantity']
-                else:  # short
-                    pnl = (position['entry_price'] - current_price) * position['quantity']
-                unrealized_pnl += pnl
-        
-        return self.balance + unrealized_pnl
+                prices[idx] = current_prices[symbol]
+        
+        # Reuse the prices buffer and reduce with a dot product: no extra temporaries
+        prices -= self._entry[:n]
+        prices *= self._side[:n]
+        unrealized_pnl = np.dot(prices, self._qty[:n])
+        return self.balance + float(unrealized_pnl)
+    
+    def _alloc_slot(self, symbol: str) -> int:
+        """Reserve an array slot for a new position, growing the arrays when full."""
+        if self._free:
+            idx = self._free.pop()
+        else:
+            if self._n == len(self._entry):
+                cap = len(self._entry) * 2
+                self._entry = np.resize(self._entry, cap)
+                self._qty = np.resize(self._qty, cap)
+                self._side = np.resize(self._side, cap)
+            idx = self._n
+            self._n += 1
+        self._sym_to_idx[symbol] = idx
+        return idx
+    
+    def _free_slot(self, symbol: str):
+        idx = self._sym_to_idx.pop(symbol)
+        self._qty[idx] = 0.0
+        self._free.append(idx)
     
     def place_limit_order(self, symbol: str, side: str, price: float, amount: float) -> Dict:
         """
@@ -60,7 +118,7 @@ class PaperTradingSimulator:
         Returns:
             Order data dict
         """
-        order_id = str(uuid.uuid4())
+        order_id = new_id()
         
         order = {
             'order_id': order_id,
@@ -69,12 +127,12 @@ class PaperTradingSimulator:
             'price': price,
             'amount': amount,
             'status': 'pending',
-            'created_at': datetime.now()
+            'created_at': now_ms()
         }
         
         self.pending_orders[order_id] = order
         
-        logger.info(f"[PAPER] Placed {side} limit order: {symbol} @ ${price:.2f} qty={amount}")
+        logger.info("[PAPER] Placed %s limit order: %s @ $%.2f qty=%s", side, symbol, price, amount)
         
         return order
     
@@ -110,6 +168,34 @@ class PaperTradingSimulator:
         
         return False
     
+    def simulate_fills_batch(self, prices: Dict[str, float]) -> List[str]:
+        """
+        Fill every pending order whose limit the given prices crossed.
+        The whole book is tested in one NumPy comparison instead of per-order calls.
+        
+        Args:
+            prices: Dict of symbol -> current_price
+            
+        Returns:
+            IDs of the orders that were filled
+        """
+        orders = [o for o in self.pending_orders.values()
+                  if o['symbol'] in prices and o['side'] in ('buy', 'sell')]
+        if not orders:
+            return []
+        
+        n = len(orders)
+        limit = np.fromiter((o['price'] for o in orders), dtype=np.float64, count=n)
+        market = np.fromiter((prices[o['symbol']] for o in orders), dtype=np.float64, count=n)
+        # buy fills at market <= limit, sell at market >= limit
+        sign = np.fromiter((1 if o['side'] == 'sell' else -1 for o in orders), dtype=np.int8, count=n)
+        
+        filled = []
+        for i in np.flatnonzero(sign * (market - limit) >= 0):
+            self._execute_fill(orders[i], float(market[i]))
+            filled.append(orders[i]['order_id'])
+        return filled
+    
     def _execute_fill(self, order: Dict, fill_price: float):
         """Execute order fill and update balances/positions."""
         order_id = order['order_id']
@@ -119,11 +205,14 @@ class PaperTradingSimulator:
         
         # Update order status
         order['status'] = 'filled'
-        order['filled_at'] = datetime.now()
+        order['filled_at'] = now_ms()
         order['fill_price'] = fill_price
         
-        # Move to filled orders
+        # Move to filled orders, dropping the evicted fill from the index too
+        if len(self.filled_orders) == self.filled_orders.maxlen:
+            self.filled_orders_by_id.pop(self.filled_orders[0]['order_id'], None)
         self.filled_orders.append(order)
+        self.filled_orders_by_id[order_id] = order
         del self.pending_orders[order_id]
         
         # Update balance and positions
@@ -136,22 +225,28 @@ class PaperTradingSimulator:
             if symbol in self.positions:
                 # Average down (shouldn't happen with max_positions=1, but handle it)
                 pos = self.positions[symbol]
-                total_qty = pos['quantity'] + amount
-                avg_price = ((pos['entry_price'] * pos['quantity']) + (fill_price * amount)) / total_qty
-                pos['quantity'] = total_qty
-                pos['entry_price'] = avg_price
+                total_qty = pos.quantity + amount
+                avg_price = ((pos.entry_price * pos.quantity) + (fill_price * amount)) / total_qty
+                pos.quantity = total_qty
+                pos.entry_price = avg_price
+                idx = self._sym_to_idx[symbol]
             else:
-                self.positions[symbol] = {
-                    'position_id': str(uuid.uuid4()),
-                    'symbol': symbol,
-                    'side': 'long',
-                    'entry_price': fill_price,
-                    'quantity': amount,
-                    'entry_time': datetime.now(),
-                    'status': 'open'
-                }
+                pos = self.positions[symbol] = Position(
+                    position_id=new_id(),
+                    symbol=symbol,
+                    side='long',
+                    entry_price=fill_price,
+                    quantity=amount,
+                    entry_time=now_ms(),
+                    status='open'
+                )
+                idx = self._alloc_slot(symbol)
+                self._side[idx] = 1
+            
+            self._entry[idx] = pos.entry_price
+            self._qty[idx] = pos.quantity
             
-            logger.info(f"[PAPER] ✅ BUY filled: {amount} {symbol} @ ${fill_price:.2f} | Balance: ${self.balance:.2f}")
+            logger.info("[PAPER] ✅ BUY filled: %s %s @ $%.2f | Balance: $%.2f", amount, symbol, fill_price, self.balance)
             
         else:  # sell
             # Add proceeds to balance
@@ -163,27 +258,33 @@ class PaperTradingSimulator:
                 pos = self.positions[symbol]
                 
                 # Calculate realized P&L
-                realized_pnl = (fill_price - pos['entry_price']) * amount
+                realized_pnl = (fill_price - pos.entry_price) * amount
                 
-                pos['quantity'] -= amount
+                pos.quantity -= amount
                 
-                if pos['quantity'] <= 0:
+                if pos.quantity <= 0:
                     # Position closed
-                    pos['status'] = 'closed'
-                    pos['exit_price'] = fill_price
-                    pos['exit_time'] = datetime.now()
-                    pos['pnl'] = realized_pnl
+                    pos.status = 'closed'
+                    pos.exit_price = fill_price
+                    pos.exit_time = now_ms()
+                    pos.pnl = realized_pnl
                     
                     # Remove from active positions
                     del self.positions[symbol]
+                    self._free_slot(symbol)
+                else:
+                    self._qty[self._sym_to_idx[symbol]] = pos.quantity
                 
-                logger.info(f"[PAPER] ✅ SELL filled: {amount} {symbol} @ ${fill_price:.2f} | P&L: ${realized_pnl:+.2f} | Balance: ${self.balance:.2f}")
+                logger.info("[PAPER] ✅ SELL filled: %s %s @ $%.2f | P&L: $%+.2f | Balance: $%.2f", amount, symbol, fill_price, realized_pnl, self.balance)
             else:
-                logger.warning(f"[PAPER] SELL order filled but no position exists for {symbol}")
+                logger.warning("[PAPER] SELL order filled but no position exists for %s", symbol)
     
     def get_position(self, symbol: str) -> Optional[Dict]:
-        """Get current position for symbol."""
-        return self.positions.get(symbol)
+        """Get a snapshot of the current position for symbol, as a dict."""
+        if not self.positions:
+            return None
+        pos = self.positions.get(symbol)
+        return pos.to_dict() if pos else None
     
     def has_open_position(self, symbol: str) -> bool:
         """Check if there's an open position for symbol."""
@@ -191,7 +292,8 @@ class PaperTradingSimulator:
     
     def get_stats(self, current_prices: Dict[str, float]) -> Dict:
         """Get account statistics."""
-        equity = self.get_equity(current_prices)
+        n_pos = len(self.positions)
+        equity = self.get_equity(current_prices) if n_pos else self.balance
         total_pnl = equity - self.initial_balance
         
         return {
@@ -199,6 +301,6 @@ class PaperTradingSimulator:
             'equity': equity,
             'total_pnl': total_pnl,
             'pnl_pct': (total_pnl / self.initial_balance) * 100,
-            'open_positions': len(self.positions),
+            'open_positions': n_pos,
             'pending_orders': len(self.pending_orders)
         }
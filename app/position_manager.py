@@ -1,10 +1,10 @@
+import heapq
 import logging
 import time
-import uuid
-from datetime import datetime, timedelta
-from decimal import Decimal
 from typing import Optional, Dict, List
-from paper_trading import PaperTradingSimulator
+from boto3.dynamodb.conditions import Key
+from paper_trading import PaperTradingSimulator, now_ms
+from ids import new_id
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +17,12 @@ class PositionManager:
     - P&L tracking at account and trade levels
     """
     
+    # Order fields DynamoDB hands back as Decimal, converted once on import
+    ORDER_FLOAT_FIELDS = ('price', 'amount')
+    ORDER_TIME_FIELDS = ('created_at', 'expires_at')
+    # Unrealized P&L moves smaller than this (USD) aren't written to the DB
+    PNL_WRITE_THRESHOLD = 0.01
+    
     def __init__(self, exchange, db, config, mode="TEST"):
         self.exchange = exchange
         self.db = db
@@ -27,11 +33,12 @@ class PositionManager:
         self.use_min_quantity = config.get('use_min_quantity', True)
         self.order_ttl_seconds = config.get('order_ttl', 300)  # 5 minutes
         self.max_slippage_pct = config.get('max_slippage_pct', 0.5)
+        self.pnl_write_interval = config.get('pnl_write_interval', 5)  # seconds between unrealized P&L writes
         
         # Mode-specific initialization
         if mode == "TEST":
             initial_balance = config.get('test_initial_balance', 10000.0)
-            self.simulator = PaperTradingSimulator(initial_balance)
+            self.simulator = PaperTradingSimulator(initial_balance, config.get('history_cap', 10_000))
             # Use test tables
             self.positions_table_name = 'test_positions'
             self.orders_table_name = 'test_orders'
@@ -40,27 +47,31 @@ class PositionManager:
             self.simulator = None
             self.positions_table_name = 'positions'
             self.orders_table_name = 'orders'
-            logger.info(f"PositionManager in LIVE mode - REAL TRADES ENABLED")
+            logger.info("PositionManager in LIVE mode - REAL TRADES ENABLED")
         
         # State
         self.current_position = self.db.get_active_position(self.mode)
         if self.current_position:
-            logger.info(f"Restored active position from DB: {self.current_position['symbol']} ({self.current_position['status']})")
+            logger.info("Restored active position from DB: %s (%s)", self.current_position['symbol'], self.current_position['status'])
         
         self.pending_orders = {}  # order_id -> order_data
+        self._markets = {}  # symbol -> exchange market info (static within a run)
+        self._expiry_heap = []  # (expires_at, order_id); stale entries are skipped on pop
+        self._last_pnl_write = 0.0  # time.monotonic() of the last unrealized P&L write
+        self._written_pnl = None  # (position_id, pnl) last sent to the DB
         
-        logger.info(f"Risk controls: max_positions={self.max_positions}, "
-                   f"use_min_quantity={self.use_min_quantity}, order_ttl={self.order_ttl_seconds}s")
+        logger.info("Risk controls: max_positions=%s, use_min_quantity=%s, order_ttl=%ss",
+                    self.max_positions, self.use_min_quantity, self.order_ttl_seconds)
     
     def can_open_position(self, symbol: str) -> bool:
         """Check if we can open a new position."""
         if self.current_position is not None:
-            logger.warning(f"Cannot open position for {symbol}: already have open position")
+            logger.warning("Cannot open position for %s: already have open position", symbol)
             return False
         
         # Check pending orders
         if len(self.pending_orders) > 0:
-            logger.warning(f"Cannot open position for {symbol}: have pending orders")
+            logger.warning("Cannot open position for %s: have pending orders", symbol)
             return False
             
         return True
@@ -71,24 +82,28 @@ class PositionManager:
         Initially uses exchange minimum for conservative risk management.
         """
         try:
-            # Load market info
-            if not self.exchange.markets:
-                self.exchange.load_markets()
-            
-            market = self.exchange.market(symbol)
-            min_amount = market['limits']['amount']['min']
+            min_amount = self._market(symbol)['limits']['amount']['min']
             
             if self.use_min_quantity:
-                logger.info(f"Using minimum quantity for {symbol}: {min_amount}")
+                logger.info("Using minimum quantity for %s: %s", symbol, min_amount)
                 return min_amount
             else:
                 # Future: could implement percentage-based sizing here
                 return min_amount
                 
         except Exception as e:
-            logger.error(f"Error calculating position size for {symbol}: {e}")
+            logger.error("Error calculating position size for %s: %s", symbol, e)
             return None
     
+    def _market(self, symbol: str) -> Dict:
+        """Exchange market info for symbol, loading markets once and caching per symbol."""
+        market = self._markets.get(symbol)
+        if market is None:
+            if not self.exchange.markets:
+                self.exchange.load_markets()
+            market = self._markets[symbol] = self.exchange.market(symbol)
+        return market
+    
     def place_limit_order(self, symbol: str, side: str, current_price: float, amount: float, order_type: str = 'entry') -> Optional[Dict]:
         """
         Place a limit order with slight offset from current price.
@@ -106,35 +121,28 @@ class PositionManager:
                 # Paper trading - use simulator
                 order_data = self.simulator.place_limit_order(symbol, side, limit_price, amount)
                 order_data['type'] = order_type # Tag order type
-                self.pending_orders[order_data['order_id']] = order_data
+                # Same TTL as LIVE orders, so an unfilled paper order can't block new entries
+                order_data['expires_at'] = order_data['created_at'] + self.order_ttl_seconds * 1000
+                self._track_order(order_data)
                 
-                # Log to test tables - use appropriate method or direct table access
-                try:
-                    # Convert datetime to timestamp for DynamoDB
-                    order_log = order_data.copy()
-                    order_log['created_at'] = int(order_data['created_at'].timestamp() * 1000)
-                    if 'expires_at' in order_log:
-                        order_log['expires_at'] = int(order_data['expires_at'].timestamp() * 1000)
-                    
-                    # Log to test orders table
-                    self.db.test_orders_table.put_item(Item=order_log)
-                    logger.info(f"[TEST] Order logged to test_orders table: {order_data['order_id']}")
-                except Exception as e:
-                    logger.error(f"Failed to log test order to DB: {e}")
+                # Log to test orders table (written in the background, like LIVE orders)
+                self.db.log_order(order_data, self.mode)
+                logger.info("[TEST] Order logged to test_orders table: %s", order_data['order_id'])
                 
                 return order_data
                 
             else:  # LIVE mode
                 # Round to appropriate precision
-                market = self.exchange.market(symbol)
+                self._market(symbol)  # Fails fast on an unknown symbol
                 limit_price = self.exchange.price_to_precision(symbol, limit_price)
                 
-                logger.info(f"[LIVE] Placing {side} limit order: {symbol} @ {limit_price} qty={amount} ({order_type})")
+                logger.info("[LIVE] Placing %s limit order: %s @ %s qty=%s (%s)", side, symbol, limit_price, amount, order_type)
                 
                 # Place real order
                 order = self.exchange.create_limit_order(symbol, side, amount, limit_price)
                 
                 # Track order
+                created_at = now_ms()
                 order_data = {
                     'order_id': order['id'],
                     'symbol': symbol,
@@ -142,136 +150,53 @@ class PositionManager:
                     'price': limit_price,
                     'amount': amount,
                     'status': 'pending',
-                    'created_at': datetime.now(),
-                    'expires_at': datetime.now() + timedelta(seconds=self.order_ttl_seconds),
+                    'created_at': created_at,
+                    'expires_at': created_at + self.order_ttl_seconds * 1000,
                     'type': order_type # Tag
                 }
                 
-                self.pending_orders[order['id']] = order_data
+                self._track_order(order_data)
                 self.db.log_order(order_data)
                 
-                logger.info(f"[LIVE] Order placed successfully: {order['id']}")
+                logger.info("[LIVE] Order placed successfully: %s", order['id'])
                 return order_data
                 
         except Exception as e:
-            logger.error(f"Failed to place limit order for {symbol}: {e}")
+            logger.error("Failed to place limit order for %s: %s", symbol, e)
             return None
     
-    def check_order_status(self, order_id: str, current_price: float = None) -> Optional[Dict]:
-        """Check if an order has been filled."""
+    def check_order_status(self, order_id: str, current_price: float = None,
+                           symbol: str = None) -> Optional[Dict]:
+        """
+        Check if an order has been filled. LIVE lookups need the order's symbol
+        (Binance's fetch_order requires it); it defaults to the pending order's.
+        """
         try:
             if self.mode == "TEST":
                 if not current_price:
                     return None
                     
                 # Simulate fill
-                filled = self.simulator.simulate_fill(order_id, current_price)
-                
-                if filled:
-                    # Retrieve filled order from simulator
-                    filled_order = None
-                    for o in self.simulator.filled_orders:
-                        if o['order_id'] == order_id:
-                            filled_order = o
-                            break
-                    
-                    if filled_order:
-                        logger.info(f"[TEST] Order {order_id} filled at {filled_order['fill_price']}")
-                        
-                        # retrieve local tracked order to get type
-                        local_order = self.pending_orders.get(order_id)
-                        order_type = local_order.get('type', 'entry') if local_order else 'entry'
-
-                        # Update pending orders (remove from local pending)
-                        if order_id in self.pending_orders:
-                            self.pending_orders.pop(order_id)
-                        
-                        # Update DB: test_orders
-                        try:
-                            # Convert datetimes
-                            order_log = filled_order.copy()
-                            order_log['created_at'] = int(order_log['created_at'].timestamp() * 1000)
-                            if 'filled_at' in order_log:
-                                order_log['filled_at'] = int(order_log['filled_at'].timestamp() * 1000)
-                            if 'expires_at' in order_log:
-                                order_log['expires_at'] = int(order_log['expires_at'].timestamp() * 1000)
-                            
-                            self.db.test_orders_table.put_item(Item=order_log)
-                        except Exception as e:
-                            logger.error(f"Failed to persist filled test order: {e}")
-
-                        # LOGIC SPLIT: Entry vs Exit
-                        if order_type == 'entry':
-                            # Update DB: test_positions (CREATE)
-                            symbol = filled_order['symbol']
-                            position = self.simulator.get_position(symbol)
-                            if position:
-                                try:
-                                    pos_log = position.copy()
-                                    pos_log['entry_time'] = int(pos_log['entry_time'].timestamp() * 1000)
-                                    if 'exit_time' in pos_log and pos_log['exit_time']:
-                                        pos_log['exit_time'] = int(pos_log['exit_time'].timestamp() * 1000)
-                                    for k, v in pos_log.items():
-                                        if isinstance(v, float):
-                                            pos_log[k] = Decimal(str(v))
-                                    self.db.test_positions_table.put_item(Item=pos_log)
-                                    logger.info(f"[TEST] Position persisted for {symbol}")
-                                    
-                                    # Sync local current_position
-                                    self.current_position = position # Simulator obj needs mapping? 
-                                    # Simulator position is dict, matches our format mostly. 
-                                    # Actually simulator keeps positions in memory. PositionManager should also invoke _create_position_from_order conceptually triggers same thing.
-                                    # In TEST mode, simulator manages positions. We just rely on simulator.get_position.
-                                    # But wait, self.current_position is used by checks. We should sync it.
-                                    self.current_position = position
-
-                                except Exception as e:
-                                    logger.error(f"Failed to persist test position: {e}")
-                        
-                        elif order_type == 'exit':
-                             # CLOSED
-                             logger.info(f"[TEST] Exit order filled. Clearing current position.")
-                             self.current_position = None
-                             # DB update: Simulator updates DB? No, we did above.
-                             # We need to update the CLOSED position in DB.
-                             # Get historic positions from simulator?
-                             # Or just update status.
-                             # Actually simulator moves to closed_positions.
-                             # We should find it and sync.
-                             if self.simulator.closed_positions:
-                                 last_closed = self.simulator.closed_positions[-1]
-                                 if last_closed['symbol'] == filled_order['symbol']:
-                                      # Log closed pos to DB
-                                      try:
-                                          pos_log = last_closed.copy()
-                                          pos_log['entry_time'] = int(pos_log['entry_time'].timestamp() * 1000)
-                                          pos_log['exit_time'] = int(pos_log['exit_time'].timestamp() * 1000)
-                                          for k, v in pos_log.items():
-                                              if isinstance(v, float): pos_log[k] = Decimal(str(v))
-                                          self.db.test_positions_table.put_item(Item=pos_log)
-                                          logger.info(f"[TEST] Closed position persisted.")
-                                      except Exception as e:
-                                          logger.error(f"Failed persist closed pos: {e}")
-
-                        return filled_order
+                if self.simulator.simulate_fill(order_id, current_price):
+                    return self._on_test_fill(order_id)
                 return None
 
             else:  # LIVE MODE
-                order = self.exchange.fetch_order(order_id)
+                if symbol is None and order_id in self.pending_orders:
+                    symbol = self.pending_orders[order_id]['symbol']
+                order = self.exchange.fetch_order(order_id, symbol)
                 
                 if order['status'] == 'closed':
                     # Order filled!
-                    logger.info(f"Order {order_id} filled at {order['average']}")
+                    logger.info("Order %s filled at %s", order_id, order['average'])
+                    filled_at = now_ms()
                     
                     # Update pending orders
                     local_order_data = None
                     if order_id in self.pending_orders:
                         local_order_data = self.pending_orders.pop(order_id)
                         local_order_data['status'] = 'filled'
-                        local_order_data['filled_at'] = datetime.now()
-                        
-                        # Update database
-                        self.db.update_order(local_order_data)
+                        local_order_data['filled_at'] = filled_at
                     
                     order_type = local_order_data.get('type', 'entry') if local_order_data else 'entry'
                     
@@ -280,13 +205,13 @@ class PositionManager:
                         self._create_position_from_order(local_order_data, order)
                     else: # Exit
                         # Close position logic
-                        logger.info(f"Exit order {order_id} filled. Closing position.")
+                        logger.info("Exit order %s filled. Closing position.", order_id)
                         
                         if self.current_position:
                              # Update local state
                              self.current_position['status'] = 'closed'
                              self.current_position['exit_price'] = float(order['average'])
-                             self.current_position['exit_time'] = datetime.now()
+                             self.current_position['exit_time'] = filled_at
                              # Calculate Final PnL
                              if self.current_position['side'] == 'long':
                                  pnl = (self.current_position['exit_price'] - self.current_position['entry_price']) * self.current_position['quantity']
@@ -294,41 +219,186 @@ class PositionManager:
                                  pnl = (self.current_position['entry_price'] - self.current_position['exit_price']) * self.current_position['quantity']
                              self.current_position['pnl'] = pnl
                              
-                             # DB Update: Log closed position
-                             self.db.log_position(self.current_position)
+                             # DB Update: filled order + closed position in one transaction
+                             # Counted only once the close is written, so a failed commit isn't booked
+                             if self.db.commit_fill(local_order_data, self.current_position, self.mode):
+                                 self.db.record_closed_pnl(pnl, self.mode)
+                             else:
+                                 logger.error("Closed position %s was not recorded in the DB",
+                                              self.current_position['position_id'])
                              
                              # Reset
                              self.current_position = None
+                        elif local_order_data:
+                             self.db.update_order(local_order_data, self.mode)
                         
                     return order
                     
                 elif order['status'] == 'canceled':
-                    logger.info(f"Order {order_id} was canceled")
+                    logger.info("Order %s was canceled", order_id)
                     if order_id in self.pending_orders:
                         self.pending_orders.pop(order_id)
                         
                 return order
             
         except Exception as e:
-            logger.error(f"Error checking order {order_id}: {e}")
+            logger.error("Error checking order %s: %s", order_id, e)
+            return None
+    
+    def check_test_fills(self, prices: Dict[str, float]) -> List[Dict]:
+        """
+        TEST mode: fill every simulator order whose limit the latest prices crossed,
+        checking the whole pending book in one pass. Returns the filled orders.
+        """
+        filled = []
+        for order_id in self.simulator.simulate_fills_batch(prices):
+            order = self._on_test_fill(order_id)
+            if order:
+                filled.append(order)
+        return filled
+    
+    def check_live_fills(self) -> List[Dict]:
+        """
+        LIVE mode: one fetch_open_orders call per symbol instead of a fetch_order per
+        pending order. Only orders no longer on the book are fetched individually to
+        settle them. Returns those orders.
+        """
+        by_symbol = {}
+        for order_id, order_data in self.pending_orders.items():
+            by_symbol.setdefault(order_data['symbol'], []).append(order_id)
+        
+        settled = []
+        for symbol, order_ids in by_symbol.items():
+            try:
+                open_ids = {o['id'] for o in self.exchange.fetch_open_orders(symbol)}
+            except Exception as e:
+                logger.error("Error fetching open orders for %s: %s", symbol, e)
+                continue
+            for order_id in order_ids:
+                if order_id not in open_ids:
+                    order = self.check_order_status(order_id, symbol=symbol)
+                    if order:
+                        settled.append(order)
+        return settled
+    
+    def _on_test_fill(self, order_id: str) -> Optional[Dict]:
+        """Persist a simulator fill and update local position state."""
+        try:
+            # Retrieve filled order from simulator
+            filled_order = self.simulator.filled_orders_by_id.get(order_id)
+                    
+            if filled_order:
+                logger.info("[TEST] Order %s filled at %s", order_id, filled_order['fill_price'])
+                        
+                # retrieve local tracked order to get type
+                local_order = self.pending_orders.get(order_id)
+                order_type = local_order.get('type', 'entry') if local_order else 'entry'
+
+                # Update pending orders (remove from local pending)
+                if order_id in self.pending_orders:
+                    self.pending_orders.pop(order_id)
+                        
+                # LOGIC SPLIT: Entry vs Exit
+                # The filled order goes to test_orders in the same transaction as its position
+                order_written = False
+                if order_type == 'entry':
+                    # Update DB: test_positions (CREATE)
+                    symbol = filled_order['symbol']
+                    position = self.simulator.get_position(symbol)
+                    if position:
+                        try:
+                            if self.db.commit_fill(filled_order, position, self.mode):
+                                logger.info("[TEST] Position persisted for %s", symbol)
+                            order_written = True
+                                    
+                            # Sync local current_position
+                            self.current_position = position # Simulator obj needs mapping? 
+                            # Simulator position is dict, matches our format mostly. 
+                            # Actually simulator keeps positions in memory. PositionManager should also invoke _create_position_from_order conceptually triggers same thing.
+                            # In TEST mode, simulator manages positions. We just rely on simulator.get_position.
+                            # But wait, self.current_position is used by checks. We should sync it.
+                            self.current_position = position
+
+                        except Exception as e:
+                            logger.error("Failed to persist test position: %s", e)
+                        
+                elif order_type == 'exit':
+                     symbol = filled_order['symbol']
+                     position = self.current_position
+                     # The simulator drops the position once it is fully sold
+                     self.current_position = self.simulator.get_position(symbol)
+                     if not self.current_position:
+                         logger.info("[TEST] Exit order filled. Clearing current position.")
+                     if position and position['symbol'] == symbol:
+                         # Take the fill off the DB position; DynamoDB closes it at zero quantity
+                         try:
+                             fill_price = filled_order['fill_price']
+                             amount = filled_order['amount']
+                             if position['side'] == 'long':
+                                 pnl = (fill_price - position['entry_price']) * amount
+                             else:
+                                 pnl = (position['entry_price'] - fill_price) * amount
+                             remaining = self.db.reduce_position(
+                                 position['position_id'], symbol, amount, pnl,
+                                 fill_price, filled_order['filled_at'], self.mode
+                             )
+                             if remaining is not None:
+                                 logger.info("[TEST] Position persisted, %s %s left.", remaining, symbol)
+                         except Exception as e:
+                             logger.error("Failed persist closed pos: %s", e)
+
+                if not order_written:
+                    self.db.update_order(filled_order, self.mode)
+
+                return filled_order
+            return None
+        except Exception as e:
+            logger.error("Error handling test fill %s: %s", order_id, e)
             return None
     
+    def _order_from_db(self, order: Dict):
+        """
+        Convert a DynamoDB order in place, touching only the known numeric fields:
+        floats for price/amount, int millis for timestamps (missing ones get defaults).
+        """
+        for field in self.ORDER_FLOAT_FIELDS:
+            if field in order:
+                order[field] = float(order[field])
+        
+        now = now_ms()
+        defaults = {'created_at': now, 'expires_at': now + 24 * 3600 * 1000}
+        for field in self.ORDER_TIME_FIELDS:
+            try:
+                order[field] = int(order[field])
+            except (KeyError, TypeError, ValueError, ArithmeticError):
+                order[field] = defaults[field]
+    
+    def _track_order(self, order_data: Dict):
+        """Add an order to local pending state and schedule its expiry, if any."""
+        self.pending_orders[order_data['order_id']] = order_data
+        expires_at = order_data.get('expires_at')
+        if expires_at is not None:
+            heapq.heappush(self._expiry_heap, (expires_at, order_data['order_id']))
+    
     def cancel_expired_orders(self):
         """Cancel orders that have exceeded TTL."""
-        now = datetime.now()
+        now = now_ms()
         expired = []
         
-        for order_id, order_data in self.pending_orders.items():
-            if now > order_data['expires_at']:
-                expired.append(order_id)
+        # Earliest expiry first, so this stops at the first order still live
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            expires_at, order_id = heapq.heappop(heap)
+            # Skip orders filled, cancelled or re-imported since they were scheduled
+            order_data = self.pending_orders.get(order_id)
+            if order_data is not None and order_data.get('expires_at') == expires_at:
+                expired.append((order_id, order_data))
         
-        for order_id in expired:
+        for order_id, order_data in expired:
             try:
-                order_data = self.pending_orders.get(order_id)
-                if not order_data: continue
                 symbol = order_data.get('symbol')
                 
-                logger.info(f"Canceling expired order: {order_id}")
+                logger.info("Canceling expired order: %s", order_id)
                 
                 if self.mode == "TEST" and self.simulator:
                     if order_id in self.simulator.pending_orders:
@@ -338,35 +408,36 @@ class PositionManager:
                     if symbol:
                         self.exchange.cancel_order(order_id, symbol)
                     else:
-                        logger.warning(f"Cannot cancel order {order_id} without symbol")
+                        logger.warning("Cannot cancel order %s without symbol", order_id)
                 
                 # Update Local State
-                self.pending_orders.pop(order_id)
+                del self.pending_orders[order_id]
                 
-                # Update DB
-                self.db.update_order_status(order_id, 'expired', self.mode)
+                # Update DB (in the background, the loop only needs local state)
+                self.db.submit(self.db.update_order_status, order_id, 'expired', self.mode)
                 
             except Exception as e:
-                logger.error(f"Failed to cancel expired order {order_id}: {e}")
+                logger.error("Failed to cancel expired order %s: %s", order_id, e)
     
     def _create_position_from_order(self, order_data: Dict, exchange_order: Dict):
         """Create a position when an order fills."""
         position = {
-            'position_id': str(uuid.uuid4()),
+            'position_id': new_id(),
             'symbol': order_data['symbol'],
             'side': 'long' if order_data['side'] == 'buy' else 'short',
             'entry_price': float(exchange_order['average']),
             'quantity': float(exchange_order['filled']),
-            'entry_time': datetime.now(),
+            'entry_time': now_ms(),
             'status': 'open',
             'pnl': 0.0
         }
         
         self.current_position = position
-        self.db.log_position(position, self.mode)
+        if not self.db.commit_fill(order_data, position, self.mode):
+            logger.error("Position %s was not recorded in the DB", position['position_id'])
         
-        logger.info(f"Position opened: {position['position_id']} "
-                   f"{position['side']} {position['quantity']} {position['symbol']} @ {position['entry_price']}")
+        logger.info("Position opened: %s %s %s %s @ %s", position['position_id'],
+                    position['side'], position['quantity'], position['symbol'], position['entry_price'])
     
     def close_position(self, current_price: float):
         """Close the current open position."""
@@ -391,7 +462,7 @@ class PositionManager:
         order = self.place_limit_order(pos['symbol'], exit_side, limit_price, pos['quantity'], order_type='exit')
         
         if order:
-            logger.info(f"Closing position {pos['position_id']} with order {order['order_id']}")
+            logger.info("Closing position %s with order %s", pos['position_id'], order['order_id'])
     
     def update_position_pnl(self, symbol: str, current_price: float):
         """Update unrealized P&L for open position."""
@@ -402,6 +473,38 @@ class PositionManager:
             return
             
         position = self.current_position
+        pnl = self._mark_to_market(position, current_price)
+        
+        # Update in DB
+        if self._pnl_changed(position, pnl):
+            self.db.update_position_pnl(position['position_id'], pnl, current_price, self.mode)
+    
+    def update_positions_pnl(self, prices: Dict[str, float]):
+        """Update unrealized P&L for every open position from the latest prices in one DB pass."""
+        position = self.current_position
+        if position is None or position['symbol'] not in prices:
+            return
+        
+        current_price = prices[position['symbol']]
+        pnl = self._mark_to_market(position, current_price)
+        
+        # Local state is marked every tick; the DB copy is only for the dashboard, so throttle it
+        now = time.monotonic()
+        if now - self._last_pnl_write < self.pnl_write_interval or not self._pnl_changed(position, pnl):
+            return
+        self._last_pnl_write = now
+        self.db.update_positions_pnl([(position['position_id'], pnl, current_price)], self.mode)
+    
+    def _pnl_changed(self, position: Dict, pnl: float) -> bool:
+        """Record pnl as written and return True, unless it's within PNL_WRITE_THRESHOLD of the last write."""
+        written = self._written_pnl
+        if written and written[0] == position['position_id'] and abs(pnl - written[1]) < self.PNL_WRITE_THRESHOLD:
+            return False
+        self._written_pnl = (position['position_id'], pnl)
+        return True
+    
+    def _mark_to_market(self, position: Dict, current_price: float) -> float:
+        """Set the position's unrealized P&L at current_price and return it."""
         if position['side'] == 'long':
             pnl = (current_price - position['entry_price']) * position['quantity']
         else:
@@ -409,9 +512,7 @@ class PositionManager:
             
         position['pnl'] = pnl
         position['current_price'] = current_price
-        
-        # Update in DB
-        self.db.update_position_pnl(position['position_id'], pnl, current_price, self.mode)
+        return pnl
         
     def sync_state(self):
         """
@@ -423,78 +524,37 @@ class PositionManager:
         """
         try:
             # Table Selection
-            if self.mode == "TEST":
-                orders_table = self.db.test_orders_table
-                positions_table = self.db.test_positions_table
-            else:
-                orders_table = self.db.orders_table
-                positions_table = self.db.positions_table
+            orders_table = self.db.orders_tables[self.mode]
+            positions_table = self.db.positions_tables[self.mode]
             
-            # === 1. Sync Pending Orders (New imports) ===
-            # Scan for status=pending
-            resp = orders_table.scan(
-                FilterExpression='#st = :pending',
-                ExpressionAttributeNames={'#st': 'status'},
-                ExpressionAttributeValues={':pending': 'pending'}
-            )
-            db_orders = resp.get('Items', [])
+            # Query the status GSIs so only matching rows are read, not the whole table.
+            # A key condition can't match two statuses, so the three queries go out together instead.
+            def query_status(table, index_name, status):
+                return self.db.submit_read(self.db.paginated, table.query, IndexName=index_name,
+                                      KeyConditionExpression=Key('status').eq(status))
+            pending_future = query_status(orders_table, 'status-created_at-index', 'pending')
+            cancel_future = query_status(orders_table, 'status-created_at-index', 'request_cancel')
+            close_future = query_status(positions_table, 'status-entry_time-index', 'request_close')
             
-            for order in db_orders:
+            # === 1. Sync Pending Orders (New imports) ===
+            for order in pending_future.result():
                 order_id = order['order_id']
                 if order_id not in self.pending_orders:
                     # New Order Found
-                    if 'price' in order: order['price'] = float(order['price'])
-                    if 'amount' in order: order['amount'] = float(order['amount'])
+                    self._order_from_db(order)
                     
                     if self.mode == "TEST" and self.simulator:
                         if order_id not in self.simulator.pending_orders:
-                            sim_order = order.copy()
-                            # Convert DB types to Py types for Simulator
-                            # DynamoDB returns Decimal for numbers. Simulator expects datetime for created_at.
-                            c_at = order.get('created_at')
-                            if c_at:
-                                # Handle Decimal, int, float, str
-                                if isinstance(c_at, (int, float, str, Decimal)):
-                                    try:
-                                        ts = float(c_at)
-                                        sim_order['created_at'] = datetime.fromtimestamp(ts/1000)
-                                    except:
-                                        sim_order['created_at'] = datetime.now()
-                                else:
-                                    sim_order['created_at'] = datetime.now()
-                            else:
-                                sim_order['created_at'] = datetime.now()
-                            
-                            self.simulator.pending_orders[order_id] = sim_order 
-                            logger.info(f"[TEST] Injected new dashboard order {order_id}")
+                            self.simulator.pending_orders[order_id] = order.copy()
+                            logger.info("[TEST] Injected new dashboard order %s", order_id)
                     
-                    # Store in local state (Convert timestamps first)
-                    if 'expires_at' in order and isinstance(order['expires_at'], (Decimal, int, float, str)):
-                        try:
-                            order['expires_at'] = datetime.fromtimestamp(float(order['expires_at'])/1000)
-                        except:
-                            order['expires_at'] = datetime.now() + pd.Timedelta(hours=24) # Fallback
-                            
-                    if 'created_at' in order and isinstance(order['created_at'], (Decimal, int, float, str)):
-                         try:
-                            order['created_at'] = datetime.fromtimestamp(float(order['created_at'])/1000)
-                         except:
-                            order['created_at'] = datetime.now()
-
-                    self.pending_orders[order_id] = order
-                    logger.info(f"Imported pending order {order_id} from DB")
+                    self._track_order(order)
+                    logger.info("Imported pending order %s from DB", order_id)
             
             # === 2. Process Cancel Requests ===
-            resp = orders_table.scan(
-                FilterExpression='#st = :req_cancel',
-                ExpressionAttributeNames={'#st': 'status'},
-                ExpressionAttributeValues={':req_cancel': 'request_cancel'}
-            )
-            cancel_requests = resp.get('Items', [])
-            
-            for order in cancel_requests:
+            for order in cancel_future.result():
                 order_id = order['order_id']
-                logger.info(f"Processing cancel request for {order_id}")
+                logger.info("Processing cancel request for %s", order_id)
                 
                 try:
                     if self.mode == "TEST" and self.simulator:
@@ -515,28 +575,21 @@ class PositionManager:
                         try:
                             self.exchange.cancel_order(order_id)
                         except Exception as e:
-                            logger.warning(f"Exchange cancel failed (maybe already gone): {e}")
+                            logger.warning("Exchange cancel failed (maybe already gone): %s", e)
                         
                         self.db.update_order_status(order_id, 'canceled', self.mode)
                         if order_id in self.pending_orders:
                             self.pending_orders.pop(order_id)
                             
                 except Exception as e:
-                    logger.error(f"Failed to process cancel request {order_id}: {e}")
+                    logger.error("Failed to process cancel request %s: %s", order_id, e)
 
             # === 3. Process Close Requests ===
-            resp = positions_table.scan(
-                FilterExpression='#st = :req_close',
-                ExpressionAttributeNames={'#st': 'status'},
-                ExpressionAttributeValues={':req_close': 'request_close'}
-            )
-            close_requests = resp.get('Items', [])
-            
-            for pos in close_requests:
+            for pos in close_future.result():
                 pos_id = pos['position_id']
                 # Check if it matches current position
                 if self.current_position and self.current_position['position_id'] == pos_id:
-                    logger.info(f"Processing close request for position {pos_id}")
+                    logger.info("Processing close request for position %s", pos_id)
                     # We need current price to close. 
                     # Ideally we have it from the main bot loop.
                     # We can Trigger a close flag? 
@@ -575,11 +628,11 @@ class PositionManager:
                         self.current_position['take_profit'] = float(db_pos.get('take_profit', 0)) if db_pos.get('take_profit') else None
                         # logger.info(f"Synced risk for {self.current_position['symbol']}: SL={self.current_position['stop_loss']}")
                 except Exception as e:
-                    logger.error(f"Error syncing risk params: {e}")
+                    logger.error("Error syncing risk params: %s", e)
 
         except Exception as e:
             print(f"Error syncing state: {e}")
-            logger.error(f"Error syncing state: {e}")
+            logger.error("Error syncing state: %s", e)
     
     def get_account_pnl(self) -> Dict:
         """Get account-level P&L statistics."""
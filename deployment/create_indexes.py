@@ -0,0 +1,107 @@
+import boto3
+import json
+import os
+import time
+
+# Load Config
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.json')
+
+def load_config():
+    with open(CONFIG_PATH, 'r') as f:
+        return json.load(f)
+
+# Table key -> list of (index_name, hash_attr, range_attr, range_type)
+# The symbol-* GSIs let the dashboard Query per symbol instead of Scan;
+# status-entry_time-index finds the active position without reading closed ones;
+# status-created_at-index does the same for pending/cancel-requested orders.
+# symbol-filled_at-index is sparse: only filled orders carry filled_at.
+# trades-by-time puts every trade under one constant key so the newest can be queried in order.
+INDEXES = {
+    'trades': [('trades-by-time', 'hot_shard', 'timestamp', 'N')],
+    'positions': [
+        ('symbol-entry_time-index', 'symbol', 'entry_time', 'N'),
+        ('status-entry_time-index', 'status', 'entry_time', 'N')
+    ],
+    'test_positions': [
+        ('symbol-entry_time-index', 'symbol', 'entry_time', 'N'),
+        ('status-entry_time-index', 'status', 'entry_time', 'N')
+    ],
+    'orders': [
+        ('symbol-filled_at-index', 'symbol', 'filled_at', 'N'),
+        ('symbol-status-index', 'symbol', 'status', 'S'),
+        ('status-created_at-index', 'status', 'created_at', 'N')
+    ],
+    'test_orders': [
+        ('symbol-filled_at-index', 'symbol', 'filled_at', 'N'),
+        ('symbol-status-index', 'symbol', 'status', 'S'),
+        ('status-created_at-index', 'status', 'created_at', 'N')
+    ],
+    'signals': [('symbol-timestamp-index', 'symbol', 'timestamp', 'N')]
+}
+
+# Backfilling a GSI takes minutes, so poll slowly and give up after an hour
+POLL_INTERVAL_SEC = 15
+INDEX_TIMEOUT_SEC = 3600
+
+def wait_for_index(dynamodb, table_name, index_name):
+    """Poll describe_table until the index is ACTIVE."""
+    deadline = time.monotonic() + INDEX_TIMEOUT_SEC
+    while True:
+        gsis = dynamodb.describe_table(TableName=table_name)['Table'].get('GlobalSecondaryIndexes', [])
+        status = next((g['IndexStatus'] for g in gsis if g['IndexName'] == index_name), None)
+        if status == 'ACTIVE':
+            return
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"{table_name}.{index_name} still {status} after {INDEX_TIMEOUT_SEC}s")
+        time.sleep(POLL_INTERVAL_SEC)
+
+def create_indexes():
+    config = load_config()
+    region = config['aws']['region']
+    tables = config['aws']['tables']
+
+    dynamodb = boto3.client('dynamodb', region_name=region)
+
+    for table_key, indexes in INDEXES.items():
+        table_name = tables[table_key]
+        try:
+            desc = dynamodb.describe_table(TableName=table_name)['Table']
+        except dynamodb.exceptions.ResourceNotFoundException:
+            print(f"Table {table_name} does not exist. Skipping.")
+            continue
+
+        existing = {gsi['IndexName'] for gsi in desc.get('GlobalSecondaryIndexes', [])}
+
+        for index_name, hash_attr, range_attr, range_type in indexes:
+            if index_name in existing:
+                print(f"✓ {table_name}.{index_name} already exists")
+                continue
+
+            print(f"Creating {table_name}.{index_name}...")
+            # DynamoDB only allows one GSI creation per update_table call
+            dynamodb.update_table(
+                TableName=table_name,
+                AttributeDefinitions=[
+                    {'AttributeName': hash_attr, 'AttributeType': 'S'},
+                    {'AttributeName': range_attr, 'AttributeType': range_type}
+                ],
+                GlobalSecondaryIndexUpdates=[{
+                    'Create': {
+                        'IndexName': index_name,
+                        'KeySchema': [
+                            {'AttributeName': hash_attr, 'KeyType': 'HASH'},
+                            {'AttributeName': range_attr, 'KeyType': 'RANGE'}
+                        ],
+                        'Projection': {'ProjectionType': 'ALL'}
+                    }
+                }]
+            )
+
+            # Wait for the index to finish backfilling before the next one
+            wait_for_index(dynamodb, table_name, index_name)
+            print(f"✓ {table_name}.{index_name} created")
+
+    print("\nAll indexes ready!")
+
+if __name__ == "__main__":
+    create_indexes()
@@ -19,7 +19,28 @@ try:
             {'AttributeName': 'position_id', 'KeyType': 'HASH'}
         ],
         AttributeDefinitions=[
-            {'AttributeName': 'position_id', 'AttributeType': 'S'}
+            {'AttributeName': 'position_id', 'AttributeType': 'S'},
+            {'AttributeName': 'symbol', 'AttributeType': 'S'},
+            {'AttributeName': 'entry_time', 'AttributeType': 'N'},
+            {'AttributeName': 'status', 'AttributeType': 'S'}
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                'IndexName': 'symbol-entry_time-index',
+                'KeySchema': [
+                    {'AttributeName': 'symbol', 'KeyType': 'HASH'},
+                    {'AttributeName': 'entry_time', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            },
+            {
+                'IndexName': 'status-entry_time-index',
+                'KeySchema': [
+                    {'AttributeName': 'status', 'KeyType': 'HASH'},
+                    {'AttributeName': 'entry_time', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }
         ],
         BillingMode='PAY_PER_REQUEST'
     )
@@ -36,7 +57,37 @@ try:
             {'AttributeName': 'order_id', 'KeyType': 'HASH'}
         ],
         AttributeDefinitions=[
-            {'AttributeName': 'order_id', 'AttributeType': 'S'}
+            {'AttributeName': 'order_id', 'AttributeType': 'S'},
+            {'AttributeName': 'symbol', 'AttributeType': 'S'},
+            {'AttributeName': 'filled_at', 'AttributeType': 'N'},
+            {'AttributeName': 'status', 'AttributeType': 'S'},
+            {'AttributeName': 'created_at', 'AttributeType': 'N'}
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                'IndexName': 'symbol-filled_at-index',
+                'KeySchema': [
+                    {'AttributeName': 'symbol', 'KeyType': 'HASH'},
+                    {'AttributeName': 'filled_at', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            },
+            {
+                'IndexName': 'symbol-status-index',
+                'KeySchema': [
+                    {'AttributeName': 'symbol', 'KeyType': 'HASH'},
+                    {'AttributeName': 'status', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            },
+            {
+                'IndexName': 'status-created_at-index',
+                'KeySchema': [
+                    {'AttributeName': 'status', 'KeyType': 'HASH'},
+                    {'AttributeName': 'created_at', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }
         ],
         BillingMode='PAY_PER_REQUEST'
     )
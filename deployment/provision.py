@@ -26,7 +26,19 @@ def create_dynamodb_tables():
     table_defs = {
         TABLES['trades']: {
             'KeySchema': [{'AttributeName': 'trade_id', 'KeyType': 'HASH'}],
-            'AttributeDefinitions': [{'AttributeName': 'trade_id', 'AttributeType': 'S'}]
+            'AttributeDefinitions': [
+                {'AttributeName': 'trade_id', 'AttributeType': 'S'},
+                {'AttributeName': 'hot_shard', 'AttributeType': 'S'},
+                {'AttributeName': 'timestamp', 'AttributeType': 'N'}
+            ],
+            'GlobalSecondaryIndexes': [{
+                'IndexName': 'trades-by-time',
+                'KeySchema': [
+                    {'AttributeName': 'hot_shard', 'KeyType': 'HASH'},
+                    {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }]
         },
         TABLES['stats']: {
             'KeySchema': [
@@ -46,11 +58,25 @@ def create_dynamodb_tables():
             'AttributeDefinitions': [
                 {'AttributeName': 'symbol', 'AttributeType': 'S'},
                 {'AttributeName': 'timestamp', 'AttributeType': 'N'}
-            ]
+            ],
+            # The bot stamps price/candle items with an epoch-seconds expiry
+            'TimeToLive': 'expiry'
         },
         TABLES['signals']: {
             'KeySchema': [{'AttributeName': 'signal_id', 'KeyType': 'HASH'}],
-            'AttributeDefinitions': [{'AttributeName': 'signal_id', 'AttributeType': 'S'}]
+            'AttributeDefinitions': [
+                {'AttributeName': 'signal_id', 'AttributeType': 'S'},
+                {'AttributeName': 'symbol', 'AttributeType': 'S'},
+                {'AttributeName': 'timestamp', 'AttributeType': 'N'}
+            ],
+            'GlobalSecondaryIndexes': [{
+                'IndexName': 'symbol-timestamp-index',
+                'KeySchema': [
+                    {'AttributeName': 'symbol', 'KeyType': 'HASH'},
+                    {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }]
         }
     }
     
@@ -61,13 +87,34 @@ def create_dynamodb_tables():
             print(f"Table {table_name} already exists.")
         else:
             print(f"Creating table {table_name}...")
-            dynamodb.create_table(
-                TableName=table_name,
-                KeySchema=schema['KeySchema'],
-                AttributeDefinitions=schema['AttributeDefinitions'],
-                BillingMode='PAY_PER_REQUEST'
-            )
+            create_kwargs = {
+                'TableName': table_name,
+                'KeySchema': schema['KeySchema'],
+                'AttributeDefinitions': schema['AttributeDefinitions'],
+                'BillingMode': 'PAY_PER_REQUEST'
+            }
+            if 'GlobalSecondaryIndexes' in schema:
+                create_kwargs['GlobalSecondaryIndexes'] = schema['GlobalSecondaryIndexes']
+            dynamodb.create_table(**create_kwargs)
             print(f"Table {table_name} created.")
+        
+        if 'TimeToLive' in schema:
+            enable_ttl(table_name, schema['TimeToLive'])
+
+def enable_ttl(table_name, attribute):
+    """Turn on DynamoDB TTL so items past their expiry attribute are deleted server-side."""
+    ttl = dynamodb.describe_time_to_live(TableName=table_name)['TimeToLiveDescription']
+    if ttl.get('TimeToLiveStatus') in ('ENABLED', 'ENABLING'):
+        print(f"TTL on {table_name}.{ttl.get('AttributeName')} already enabled.")
+        return
+    
+    # UpdateTimeToLive needs the table to be ACTIVE
+    dynamodb.get_waiter('table_exists').wait(TableName=table_name)
+    dynamodb.update_time_to_live(
+        TableName=table_name,
+        TimeToLiveSpecification={'Enabled': True, 'AttributeName': attribute}
+    )
+    print(f"TTL enabled on {table_name}.{attribute}.")
 
 def create_security_group():
     print("--- Checking Security Group ---")
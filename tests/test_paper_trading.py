@@ -0,0 +1,135 @@
+import unittest
+import sys
+import os
+
+# Adjust path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from paper_trading import PaperTradingSimulator, Position
+
+def open_position(sim, symbol, side, entry_price, quantity):
+    """Open a position the way _execute_fill does: Position object plus its array slot."""
+    sim.positions[symbol] = Position(
+        position_id=f"pos-{symbol}", symbol=symbol, side=side,
+        entry_price=entry_price, quantity=quantity, entry_time=0, status='open'
+    )
+    idx = sim._alloc_slot(symbol)
+    sim._side[idx] = 1 if side == 'long' else -1
+    sim._entry[idx] = entry_price
+    sim._qty[idx] = quantity
+    return idx
+
+def close_position(sim, symbol):
+    del sim.positions[symbol]
+    sim._free_slot(symbol)
+
+def plain_equity(sim, prices):
+    """Reference get_equity: balance plus a per-position P&L sum."""
+    pnl = 0.0
+    for symbol, pos in sim.positions.items():
+        price = prices.get(symbol, pos.entry_price)
+        if pos.side == 'long':
+            pnl += (price - pos.entry_price) * pos.quantity
+        else:
+            pnl += (pos.entry_price - price) * pos.quantity
+    return sim.balance + pnl
+
+class TestPositionSlots(unittest.TestCase):
+    def setUp(self):
+        self.sim = PaperTradingSimulator(10000.0)
+
+    def test_flat_equity_is_balance(self):
+        self.assertEqual(self.sim.get_equity({'BTC/USDT': 50000.0}), 10000.0)
+
+    def test_closed_slot_is_reused(self):
+        a = open_position(self.sim, 'BTC/USDT', 'long', 100.0, 1.0)
+        open_position(self.sim, 'ETH/USDT', 'long', 10.0, 2.0)
+        close_position(self.sim, 'BTC/USDT')
+        # A freed slot holds no quantity, so it adds no P&L
+        self.assertEqual(self.sim.get_equity({'BTC/USDT': 200.0, 'ETH/USDT': 10.0}), 10000.0)
+
+        c = open_position(self.sim, 'SOL/USDT', 'short', 50.0, 3.0)
+        self.assertEqual(c, a)
+        self.assertEqual(self.sim._n, 2)
+        prices = {'ETH/USDT': 12.0, 'SOL/USDT': 40.0}
+        self.assertAlmostEqual(self.sim.get_equity(prices), plain_equity(self.sim, prices))
+
+    def test_reopen_same_symbol(self):
+        open_position(self.sim, 'BTC/USDT', 'long', 100.0, 1.0)
+        close_position(self.sim, 'BTC/USDT')
+        open_position(self.sim, 'BTC/USDT', 'short', 120.0, 2.0)
+        prices = {'BTC/USDT': 110.0}
+        self.assertAlmostEqual(self.sim.get_equity(prices), 10000.0 + 20.0)
+
+    def test_arrays_grow_past_initial_capacity(self):
+        cap = len(self.sim._entry)
+        for i in range(cap + 3):
+            open_position(self.sim, f"S{i}", 'long' if i % 2 else 'short', 100.0 + i, 1.0 + i)
+        self.assertGreater(len(self.sim._entry), cap)
+        self.assertEqual(len(self.sim._qty), len(self.sim._entry))
+        self.assertEqual(len(self.sim._side), len(self.sim._entry))
+        self.assertEqual(self.sim._n, cap + 3)
+
+        prices = {f"S{i}": 100.0 + 2 * i for i in range(cap + 3)}
+        self.assertAlmostEqual(self.sim.get_equity(prices), plain_equity(self.sim, prices))
+
+    def test_equity_matches_plain_sum(self):
+        open_position(self.sim, 'BTC/USDT', 'long', 100.0, 1.5)
+        open_position(self.sim, 'ETH/USDT', 'short', 10.0, 4.0)
+        open_position(self.sim, 'SOL/USDT', 'long', 20.0, 2.0)
+        # SOL/USDT has no price and is marked at entry
+        prices = {'BTC/USDT': 90.0, 'ETH/USDT': 8.0}
+        self.assertAlmostEqual(self.sim.get_equity(prices), plain_equity(self.sim, prices))
+        self.assertAlmostEqual(self.sim.get_equity(prices), 10000.0 - 15.0 + 8.0)
+
+    def test_equity_after_buy_and_partial_sell(self):
+        self.sim.place_limit_order('BTC/USDT', 'buy', 100.0, 2.0)
+        self.sim.simulate_fills_batch({'BTC/USDT': 100.0})
+        self.sim.place_limit_order('BTC/USDT', 'sell', 110.0, 0.5)
+        self.sim.simulate_fills_batch({'BTC/USDT': 110.0})
+        prices = {'BTC/USDT': 120.0}
+        self.assertAlmostEqual(self.sim.get_equity(prices), plain_equity(self.sim, prices))
+        self.assertAlmostEqual(self.sim.positions['BTC/USDT'].quantity, 1.5)
+
+class TestFills(unittest.TestCase):
+    def setUp(self):
+        self.sim = PaperTradingSimulator(10000.0, history_cap=3)
+
+    def test_buy_fills_at_or_below_limit(self):
+        at = self.sim.place_limit_order('BTC/USDT', 'buy', 100.0, 1.0)
+        above = self.sim.place_limit_order('ETH/USDT', 'buy', 10.0, 1.0)
+        filled = self.sim.simulate_fills_batch({'BTC/USDT': 100.0, 'ETH/USDT': 10.01})
+        self.assertEqual(filled, [at['order_id']])
+        self.assertIn(above['order_id'], self.sim.pending_orders)
+        self.assertEqual(self.sim.filled_orders_by_id[at['order_id']]['fill_price'], 100.0)
+
+    def test_sell_fills_at_or_above_limit(self):
+        self.sim.place_limit_order('BTC/USDT', 'buy', 100.0, 1.0)
+        self.sim.simulate_fills_batch({'BTC/USDT': 100.0})
+        sell = self.sim.place_limit_order('BTC/USDT', 'sell', 110.0, 1.0)
+        self.assertEqual(self.sim.simulate_fills_batch({'BTC/USDT': 109.99}), [])
+        self.assertEqual(self.sim.simulate_fills_batch({'BTC/USDT': 110.0}), [sell['order_id']])
+        self.assertNotIn('BTC/USDT', self.sim.positions)
+        self.assertAlmostEqual(self.sim.balance, 10010.0)
+
+    def test_orders_without_a_price_stay_pending(self):
+        missing = self.sim.place_limit_order('SOL/USDT', 'buy', 50.0, 1.0)
+        priced = self.sim.place_limit_order('BTC/USDT', 'buy', 100.0, 1.0)
+        self.assertEqual(self.sim.simulate_fills_batch({'BTC/USDT': 90.0}), [priced['order_id']])
+        self.assertIn(missing['order_id'], self.sim.pending_orders)
+        self.assertEqual(self.sim.simulate_fills_batch({}), [])
+
+    def test_index_tracks_capped_history(self):
+        order_ids = []
+        for i in range(5):
+            order = self.sim.place_limit_order(f"S{i}", 'buy', 10.0, 1.0)
+            self.sim.simulate_fills_batch({f"S{i}": 10.0})
+            order_ids.append(order['order_id'])
+        # Only the last history_cap fills are kept, in the deque and the index alike
+        self.assertEqual([o['order_id'] for o in self.sim.filled_orders], order_ids[2:])
+        self.assertEqual(set(self.sim.filled_orders_by_id), set(order_ids[2:]))
+        for order in self.sim.filled_orders:
+            self.assertIs(self.sim.filled_orders_by_id[order['order_id']], order)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,318 @@
+import unittest
+import sys
+import os
+from decimal import Decimal
+from unittest import mock
+from botocore.awsrequest import AWSResponse
+from botocore.stub import Stubber
+
+# Adjust path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from persistence import DynamoManager
+
+CONFIG = {
+    'aws': {
+        'region': 'us-east-1',
+        'tables': {
+            'trades': 'trades', 'stats': 'stats', 'prices': 'prices', 'signals': 'signals',
+            'positions': 'positions', 'orders': 'orders',
+            'test_positions': 'test_positions', 'test_orders': 'test_orders',
+            'test_account': 'test_account'
+        }
+    }
+}
+
+class StubbedDynamoTest(unittest.TestCase):
+    """
+    DynamoManager with Stubbers on the low-level client and the resource's client.
+    The resource's Stubber sees parameters before boto3 marshals them, so its
+    expectations use plain Python values.
+    """
+    def setUp(self):
+        self.db = DynamoManager(CONFIG)
+        self.addCleanup(self.db.shutdown)
+        self.client = Stubber(self.db.client)
+        self.resource = Stubber(self.db.dynamodb.meta.client)
+        self.client.activate()
+        self.resource.activate()
+
+    def tearDown(self):
+        self.client.assert_no_pending_responses()
+        self.resource.assert_no_pending_responses()
+
+class TestPositionTransactions(StubbedDynamoTest):
+    def test_open_position_claims_marker(self):
+        self.client.add_response('transact_write_items', {}, {'TransactItems': [
+            {'Put': {
+                'TableName': 'stats',
+                'Item': {
+                    'stat_type': {'S': 'OPEN_POSITION'},
+                    'algo': {'S': 'LIVE#BTC/USDT'},
+                    'position_id': {'S': 'p1'}
+                },
+                'ConditionExpression': 'attribute_not_exists(stat_type) OR position_id IN (:pid, :holder)',
+                'ExpressionAttributeValues': {':pid': {'S': 'p1'}, ':holder': {'S': 'p1'}}
+            }},
+            {'Put': {'TableName': 'positions', 'Item': {
+                'position_id': {'S': 'p1'},
+                'symbol': {'S': 'BTC/USDT'},
+                'side': {'S': 'long'},
+                'entry_price': {'N': '43210.12'},
+                'quantity': {'N': '0.5'},
+                'entry_time': {'N': '1000'},
+                'status': {'S': 'open'},
+                'pnl': {'N': '0'}
+            }}}
+        ]})
+        ok = self.db.log_position({
+            'position_id': 'p1', 'symbol': 'BTC/USDT', 'side': 'long',
+            'entry_price': 43210.12, 'quantity': 0.5, 'entry_time': 1000, 'status': 'open'
+        })
+        self.assertTrue(ok)
+
+    def test_close_position_releases_marker(self):
+        self.client.add_response('transact_write_items', {}, {'TransactItems': [
+            {'Update': {
+                'TableName': 'positions',
+                'Key': {'position_id': {'S': 'p1'}},
+                'UpdateExpression': 'SET #status = :status, exit_price = :exit_price, exit_time = :exit_time, pnl = :pnl',
+                'ExpressionAttributeNames': {'#status': 'status'},
+                'ExpressionAttributeValues': {
+                    ':status': {'S': 'closed'},
+                    ':exit_price': {'N': '110.5'},
+                    ':exit_time': {'N': '2000'},
+                    ':pnl': {'N': '10.5'}
+                }
+            }},
+            {'Delete': {
+                'TableName': 'stats',
+                'Key': {'stat_type': {'S': 'OPEN_POSITION'}, 'algo': {'S': 'LIVE#BTC/USDT'}}
+            }}
+        ]})
+        self.resource.add_response('update_item', {}, {
+            'TableName': 'stats',
+            'Key': {'stat_type': 'ACCOUNT_PNL', 'algo': 'LIVE'},
+            'UpdateExpression': 'ADD closed_pnl :pnl, win_count :win, loss_count :loss',
+            'ConditionExpression': 'attribute_exists(stat_type)',
+            'ExpressionAttributeValues': {':pnl': Decimal('10.5'), ':win': 1, ':loss': 0}
+        })
+        self.db.close_position('p1', 'BTC/USDT', 110.5, 2000, 10.5)
+
+class TestCommitFill(StubbedDynamoTest):
+    def test_exit_fill_is_one_transaction(self):
+        self.client.add_response('transact_write_items', {}, {'TransactItems': [
+            {'Delete': {
+                'TableName': 'stats',
+                'Key': {'stat_type': {'S': 'OPEN_POSITION'}, 'algo': {'S': 'LIVE#BTC/USDT'}}
+            }},
+            {'Put': {'TableName': 'positions', 'Item': {
+                'position_id': {'S': 'p1'},
+                'symbol': {'S': 'BTC/USDT'},
+                'side': {'S': 'long'},
+                'entry_price': {'N': '100'},
+                'quantity': {'N': '2'},
+                'entry_time': {'N': '1000'},
+                'status': {'S': 'closed'},
+                'pnl': {'N': '20.0'},
+                'exit_price': {'N': '110.0'},
+                'exit_time': {'N': '2000'}
+            }}},
+            {'Update': {
+                'TableName': 'orders',
+                'Key': {'order_id': {'S': 'x1'}},
+                'UpdateExpression': 'SET #status = :status, filled_at = :filled_at',
+                'ExpressionAttributeNames': {'#status': 'status'},
+                'ExpressionAttributeValues': {':status': {'S': 'filled'}, ':filled_at': {'N': '2000'}}
+            }}
+        ]})
+        ok = self.db.commit_fill({'order_id': 'x1', 'status': 'filled', 'filled_at': 2000}, {
+            'position_id': 'p1', 'symbol': 'BTC/USDT', 'side': 'long', 'entry_price': 100,
+            'quantity': 2, 'entry_time': 1000, 'status': 'closed', 'pnl': 20.0,
+            'exit_price': 110.0, 'exit_time': 2000
+        })
+        self.assertTrue(ok)
+
+    def test_rejected_fill_returns_false(self):
+        self.client.add_client_error('transact_write_items', 'ValidationException')
+        self.resource.add_response('update_item', {}, {
+            'TableName': 'orders',
+            'Key': {'order_id': 'x1'},
+            'UpdateExpression': 'SET #status = :status',
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': {':status': 'filled'}
+        })
+        ok = self.db.commit_fill({'order_id': 'x1', 'status': 'filled'}, {
+            'position_id': 'p1', 'symbol': 'BTC/USDT', 'side': 'long', 'entry_price': 100,
+            'quantity': 2, 'entry_time': 1000, 'status': 'closed', 'exit_price': 110, 'exit_time': 2000
+        })
+        self.assertFalse(ok)
+
+class TestReducePosition(StubbedDynamoTest):
+    def expect_reduce(self, remaining, realized):
+        self.resource.add_response('update_item', {'Attributes': {
+            'quantity': {'N': remaining}, 'realized_pnl': {'N': realized}
+        }}, {
+            'TableName': 'positions',
+            'Key': {'position_id': 'p1'},
+            'UpdateExpression': 'ADD quantity :neg, realized_pnl :pnl',
+            'ConditionExpression': 'quantity >= :amt',
+            'ExpressionAttributeValues': {':neg': Decimal('-0.5'), ':pnl': Decimal('5.0'), ':amt': Decimal('0.5')},
+            'ReturnValues': 'UPDATED_NEW'
+        })
+
+    def test_partial_exit(self):
+        self.expect_reduce('1.5', '5.0')
+        remaining = self.db.reduce_position('p1', 'BTC/USDT', 0.5, 5.0, 110.0, 2000)
+        self.assertEqual(remaining, Decimal('1.5'))
+
+    def test_last_exit_closes_position(self):
+        self.expect_reduce('0', '12.5')
+        self.client.add_response('transact_write_items', {}, {'TransactItems': [
+            {'Update': {
+                'TableName': 'positions',
+                'Key': {'position_id': {'S': 'p1'}},
+                'UpdateExpression': 'SET #status = :status, exit_price = :exit_price, exit_time = :exit_time, pnl = :pnl',
+                'ExpressionAttributeNames': {'#status': 'status'},
+                'ExpressionAttributeValues': {
+                    ':status': {'S': 'closed'},
+                    ':exit_price': {'N': '110.0'},
+                    ':exit_time': {'N': '2000'},
+                    ':pnl': {'N': '12.5'}
+                }
+            }},
+            {'Delete': {
+                'TableName': 'stats',
+                'Key': {'stat_type': {'S': 'OPEN_POSITION'}, 'algo': {'S': 'LIVE#BTC/USDT'}}
+            }}
+        ]})
+        self.resource.add_response('update_item', {}, {
+            'TableName': 'stats',
+            'Key': {'stat_type': 'ACCOUNT_PNL', 'algo': 'LIVE'},
+            'UpdateExpression': 'ADD closed_pnl :pnl, win_count :win, loss_count :loss',
+            'ConditionExpression': 'attribute_exists(stat_type)',
+            'ExpressionAttributeValues': {':pnl': Decimal('12.5'), ':win': 1, ':loss': 0}
+        })
+        self.assertEqual(self.db.reduce_position('p1', 'BTC/USDT', 0.5, 5.0, 110.0, 2000), 0)
+
+    def test_oversell_is_rejected(self):
+        self.resource.add_client_error('update_item', 'ConditionalCheckFailedException')
+        self.assertIsNone(self.db.reduce_position('p1', 'BTC/USDT', 0.5, 5.0, 110.0, 2000))
+
+class TestSerialize(StubbedDynamoTest):
+    def test_mixed_values(self):
+        self.assertEqual(self.db._serialize({
+            's': 'x', 'i': 3, 'd': Decimal('1.25'), 'b': True, 'n': None, 'm': {'k': 'v'}
+        }), {
+            's': {'S': 'x'}, 'i': {'N': '3'}, 'd': {'N': '1.25'}, 'b': {'BOOL': True},
+            'n': {'NULL': True}, 'm': {'M': {'k': {'S': 'v'}}}
+        })
+
+    def test_floats_are_rejected(self):
+        # Numbers are converted with _fast_dec before they get here
+        with self.assertRaises(TypeError):
+            self.db._serialize({'price': 1.5})
+
+class TestBatchWrites(StubbedDynamoTest):
+    def setUp(self):
+        super().setUp()
+        sleep = mock.patch('persistence.time.sleep')
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_batch_shape(self):
+        self.client.add_response('batch_write_item', {}, {'RequestItems': {
+            'prices': [{'PutRequest': {'Item': {
+                'symbol': {'S': 'BTC/USDT'}, 'timestamp': {'N': '1000'}, 'price': {'N': '43210.12'}
+            }}}],
+            'trades': [{'PutRequest': {'Item': {'trade_id': {'S': 't1'}, 'amount': {'N': '2'}}}}]
+        }})
+        self.db._write_batches({
+            'prices': {('BTC/USDT', 1000): {
+                'symbol': 'BTC/USDT', 'timestamp': 1000, 'price': Decimal('43210.12')
+            }},
+            'trades': {('t1',): {'trade_id': 't1', 'amount': 2}}
+        })
+
+    def test_unprocessed_items_are_retried(self):
+        first = {'PutRequest': {'Item': {'trade_id': {'S': 't1'}}}}
+        second = {'PutRequest': {'Item': {'trade_id': {'S': 't2'}}}}
+        self.client.add_response('batch_write_item', {'UnprocessedItems': {'trades': [second]}},
+                                 {'RequestItems': {'trades': [first, second]}})
+        self.client.add_response('batch_write_item', {'UnprocessedItems': {}},
+                                 {'RequestItems': {'trades': [second]}})
+        self.db._write_batches({'trades': {('t1',): {'trade_id': 't1'}, ('t2',): {'trade_id': 't2'}}})
+        self.assertEqual(self.sleep.call_count, 1)
+
+class TestPut(StubbedDynamoTest):
+    def test_order_put_shape(self):
+        self.client.add_response('put_item', {}, {
+            'TableName': 'test_orders',
+            'Item': {
+                'order_id': {'S': 'o1'},
+                'symbol': {'S': 'BTC/USDT'},
+                'side': {'S': 'buy'},
+                'price': {'N': '100.5'},
+                'amount': {'N': '0.25'},
+                'status': {'S': 'open'},
+                'created_at': {'N': '1000'}
+            },
+            'ConditionExpression': 'attribute_not_exists(order_id)'
+        })
+        self.db.log_order({
+            'order_id': 'o1', 'symbol': 'BTC/USDT', 'side': 'buy', 'price': 100.5,
+            'amount': 0.25, 'status': 'open', 'created_at': 1000
+        }, 'TEST')
+        # Wait for the background put
+        self.db.shutdown()
+
+class TestFloatReads(StubbedDynamoTest):
+    def page(self, price, last_key=None):
+        response = {'Items': [{'symbol': {'S': 'BTC/USDT'}, 'timestamp': {'N': '1000'}, 'price': {'N': price}}]}
+        if last_key:
+            response['LastEvaluatedKey'] = last_key
+        return response
+
+    def test_decimal_by_default(self):
+        self.resource.add_response('scan', self.page('1.5'), {'TableName': 'prices'})
+        items = self.db.paginated(self.db.prices_table.scan)
+        self.assertEqual(items[0]['price'], Decimal('1.5'))
+
+    def test_float_numbers(self):
+        self.db.float_numbers = True
+        last_key = {'symbol': {'S': 'BTC/USDT'}, 'timestamp': {'N': '1000'}}
+        self.resource.add_response('scan', self.page('1.5', last_key), {'TableName': 'prices'})
+        # The page key goes back as read, still Decimal
+        self.resource.add_response('scan', self.page('2.5'), {
+            'TableName': 'prices',
+            'ExclusiveStartKey': {'symbol': 'BTC/USDT', 'timestamp': Decimal('1000')}
+        })
+        items = self.db.paginated(self.db.prices_table.scan)
+        self.assertEqual([it['price'] for it in items], [1.5, 2.5])
+        self.assertIs(type(items[0]['timestamp']), float)
+        self.assertEqual(items[0]['symbol'], 'BTC/USDT')
+
+class _Body:
+    def stream(self, **kwargs):
+        yield b'{}'
+
+class TestWireFormat(unittest.TestCase):
+    def test_low_level_writes_are_sent_as_built(self):
+        # The Stubbers match parameters before any marshalling, so check the body that goes out
+        bodies = []
+        def send(request, **kwargs):
+            bodies.append(request.body)
+            return AWSResponse(request.url, 200, {}, _Body())
+        with mock.patch.dict(os.environ, {'AWS_ACCESS_KEY_ID': 'test', 'AWS_SECRET_ACCESS_KEY': 'test'}):
+            db = DynamoManager(CONFIG)
+            self.addCleanup(db.shutdown)
+            db.client.meta.events.register('before-send.dynamodb.TransactWriteItems', send)
+            db.log_position({
+                'position_id': 'p1', 'symbol': 'BTC/USDT', 'side': 'long',
+                'entry_price': 100, 'quantity': 1, 'entry_time': 1000, 'status': 'closed'
+            })
+        self.assertEqual(len(bodies), 1)
+        self.assertIn(b'"position_id": {"S": "p1"}', bodies[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,194 @@
+import unittest
+from unittest import mock
+import sys
+import os
+
+# Adjust path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from position_manager import PositionManager
+
+class StubDB:
+    """Records the calls PositionManager makes instead of talking to DynamoDB."""
+    def __init__(self):
+        self.pnl_writes = []
+        self.submitted = []
+        self.closed_pnl = []
+        self.commit_ok = True
+
+    def get_active_position(self, mode):
+        return None
+
+    def update_positions_pnl(self, updates, mode):
+        self.pnl_writes.extend(updates)
+
+    def submit(self, fn, *args):
+        self.submitted.append((fn, args))
+
+    def update_order_status(self, order_id, new_status, mode):
+        pass
+
+    def log_order(self, order_data, mode):
+        pass
+
+    def commit_fill(self, order_data, position_data, mode):
+        return self.commit_ok
+
+    def record_closed_pnl(self, pnl, mode):
+        self.closed_pnl.append(pnl)
+
+class StubExchange:
+    """Answers fetch_order with a fixed exchange order and, like Binance, requires its symbol."""
+    def __init__(self, order, open_orders=()):
+        self.order = order
+        self.open_orders = list(open_orders)
+        self.fetched = []
+
+    def fetch_order(self, order_id, symbol=None):
+        if symbol is None:
+            raise ValueError("fetch_order() requires a symbol argument")
+        self.fetched.append((order_id, symbol))
+        return self.order
+
+    def fetch_open_orders(self, symbol):
+        return [o for o in self.open_orders if o['symbol'] == symbol]
+
+def make_manager(db, **config):
+    return PositionManager(None, db, {'pnl_write_interval': 5, **config}, 'TEST')
+
+class TestPnlWrites(unittest.TestCase):
+    def setUp(self):
+        self.db = StubDB()
+        self.pm = make_manager(self.db)
+        self.pm.current_position = {
+            'position_id': 'p1', 'symbol': 'BTC/USDT', 'side': 'long',
+            'entry_price': 100.0, 'quantity': 1.0
+        }
+        self.clock = mock.patch('position_manager.time.monotonic')
+        self.now = self.clock.start()
+        self.addCleanup(self.clock.stop)
+
+    def tick(self, t, price):
+        self.now.return_value = t
+        self.pm.update_positions_pnl({'BTC/USDT': price})
+
+    def test_first_tick_writes(self):
+        self.tick(1000.0, 110.0)
+        self.assertEqual(self.db.pnl_writes, [('p1', 10.0, 110.0)])
+
+    def test_write_within_interval_is_skipped(self):
+        self.tick(1000.0, 110.0)
+        self.tick(1001.0, 150.0)
+        self.assertEqual(len(self.db.pnl_writes), 1)
+        # Local state is still marked every tick
+        self.assertEqual(self.pm.current_position['pnl'], 50.0)
+
+    def test_write_after_interval(self):
+        self.tick(1000.0, 110.0)
+        self.tick(1005.0, 120.0)
+        self.assertEqual(self.db.pnl_writes[-1], ('p1', 20.0, 120.0))
+
+    def test_sub_threshold_change_is_skipped(self):
+        self.tick(1000.0, 110.0)
+        self.tick(1010.0, 110.005)
+        self.assertEqual(len(self.db.pnl_writes), 1)
+        # Drift is measured from the last write, so it's sent once it adds up
+        self.tick(1020.0, 110.02)
+        self.assertEqual(len(self.db.pnl_writes), 2)
+
+    def test_new_position_writes_despite_same_pnl(self):
+        self.tick(1000.0, 110.0)
+        self.pm.current_position = dict(self.pm.current_position, position_id='p2')
+        self.tick(1010.0, 110.0)
+        self.assertEqual(self.db.pnl_writes[-1][0], 'p2')
+
+class TestOrderExpiry(unittest.TestCase):
+    def setUp(self):
+        self.db = StubDB()
+        self.pm = make_manager(self.db)
+        clock = mock.patch('position_manager.now_ms', return_value=10_000)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def track(self, order_id, expires_at):
+        self.pm._track_order({'order_id': order_id, 'symbol': 'BTC/USDT', 'expires_at': expires_at})
+
+    def expired_ids(self):
+        return [args[0] for _, args in self.db.submitted]
+
+    def test_only_due_orders_are_cancelled(self):
+        self.track('late', 20_000)
+        self.track('due', 5_000)
+        self.track('due-too', 9_999)
+        self.pm.cancel_expired_orders()
+        self.assertEqual(self.expired_ids(), ['due', 'due-too'])
+        self.assertEqual(list(self.pm.pending_orders), ['late'])
+        self.assertEqual(len(self.pm._expiry_heap), 1)
+
+    def test_filled_or_cancelled_orders_are_skipped(self):
+        self.track('filled', 5_000)
+        self.track('cancelled', 6_000)
+        self.track('due', 7_000)
+        # Filled and cancelled orders leave pending_orders but stay in the heap
+        self.pm.pending_orders.pop('filled')
+        self.pm.pending_orders.pop('cancelled')
+        self.pm.cancel_expired_orders()
+        self.assertEqual(self.expired_ids(), ['due'])
+        self.assertEqual(self.pm._expiry_heap, [])
+
+    def test_reimported_order_uses_its_new_expiry(self):
+        self.track('o1', 5_000)
+        self.pm.pending_orders.pop('o1')
+        self.track('o1', 20_000)
+        self.pm.cancel_expired_orders()
+        self.assertEqual(self.expired_ids(), [])
+        self.assertIn('o1', self.pm.pending_orders)
+
+    def test_orders_without_expiry_are_not_scheduled(self):
+        self.pm._track_order({'order_id': 'no-ttl', 'symbol': 'BTC/USDT'})
+        self.pm.cancel_expired_orders()
+        self.assertEqual(self.pm._expiry_heap, [])
+        self.assertIn('no-ttl', self.pm.pending_orders)
+
+    def test_simulator_orders_expire(self):
+        with mock.patch('paper_trading.now_ms', return_value=0):
+            order = self.pm.place_limit_order('BTC/USDT', 'buy', 100.0, 1.0)
+        self.assertEqual(order['expires_at'], self.pm.order_ttl_seconds * 1000)
+        self.assertFalse(self.pm.can_open_position('ETH/USDT'))
+        with mock.patch('position_manager.now_ms', return_value=order['expires_at'] + 1):
+            self.pm.cancel_expired_orders()
+        self.assertNotIn(order['order_id'], self.pm.simulator.pending_orders)
+        self.assertTrue(self.pm.can_open_position('ETH/USDT'))
+
+class TestLiveExitFill(unittest.TestCase):
+    def setUp(self):
+        self.db = StubDB()
+        exchange = StubExchange({'id': 'x1', 'status': 'closed', 'average': 110.0})
+        self.pm = PositionManager(exchange, self.db, {}, 'LIVE')
+        self.pm.current_position = {
+            'position_id': 'p1', 'symbol': 'BTC/USDT', 'side': 'long',
+            'entry_price': 100.0, 'quantity': 2.0, 'status': 'open'
+        }
+        self.pm.pending_orders['x1'] = {'order_id': 'x1', 'symbol': 'BTC/USDT', 'type': 'exit'}
+        self.exchange = exchange
+
+    def test_committed_close_books_pnl(self):
+        self.pm.check_order_status('x1')
+        self.assertEqual(self.db.closed_pnl, [20.0])
+        self.assertIsNone(self.pm.current_position)
+
+    def test_failed_commit_books_nothing(self):
+        self.db.commit_ok = False
+        self.pm.check_order_status('x1')
+        self.assertEqual(self.db.closed_pnl, [])
+
+    def test_live_fills_fetch_with_symbol(self):
+        self.pm.pending_orders['x2'] = {'order_id': 'x2', 'symbol': 'ETH/USDT', 'type': 'entry'}
+        self.exchange.open_orders = [{'id': 'x2', 'symbol': 'ETH/USDT'}]
+        settled = self.pm.check_live_fills()
+        self.assertEqual(self.exchange.fetched, [('x1', 'BTC/USDT')])
+        self.assertEqual([o['id'] for o in settled], ['x1'])
+        self.assertIn('x2', self.pm.pending_orders)
+
+if __name__ == '__main__':
+    unittest.main()